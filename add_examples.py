@@ -1,13 +1,10 @@
 """Скрипт для добавления примеров проектов в базу данных"""
-from app.database import Project, SessionLocal, init_db
-from datetime import datetime, UTC
+from app.database import init_db
+from app.transfer import run_import
 
 # Инициализация базы данных
 init_db()
 
-# Создание сессии
-db = SessionLocal()
-
 # Примеры проектов
 examples = [
     {
@@ -117,32 +114,6 @@ examples = [
     }
 ]
 
-try:
-    # Добавление примеров в базу данных
-    for example in examples:
-        project = Project(
-            title=example["title"],
-            industry=example["industry"],
-            timeline=example["timeline"],
-            budget=example["budget"],
-            benefits=example["benefits"],
-            created_at=datetime.now(UTC),
-            updated_at=datetime.now(UTC)
-        )
-        project.set_results_list(example["results"])
-        project.set_tech_stack_dict(example["tech_stack"])
-        if example["images"]:
-            project.set_images_list(example["images"])
-        
-        db.add(project)
-    
-    # Сохранение изменений
-    db.commit()
-    print(f"Успешно добавлено {len(examples)} примеров проектов в базу данных")
-    
-except Exception as e:
-    db.rollback()
-    print(f"Ошибка при добавлении примеров: {e}")
-    raise
-finally:
-    db.close()
+# Все примеры загружаются одним пакетом в одной транзакции
+stats = run_import(records=[{"type": "project", **example} for example in examples])
+print(f"Успешно добавлено {stats['projects_created']} примеров проектов в базу данных")
@@ -0,0 +1,159 @@
+"""Статические ассеты: версии с хэшем содержимого в имени, заранее сжатые gzip/brotli копии"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict
+
+import brotli
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from starlette.types import Scope
+
+from app.config import settings
+
+
+STATIC_DIR = "app/static"
+# Собранные ассеты лежат внутри static, чтобы отдаваться тем же обработчиком
+BUILD_DIR = os.path.join(STATIC_DIR, "build")
+
+# Ассеты с хэшем в имени. Порядок важен: шрифт раньше CSS, потому что CSS ссылается на него
+ASSET_FILES = [
+    "fonts/alteran.ttf",
+    "css/style.css",
+    "js/particles.js",
+    "js/main.js",
+]
+
+# Сжатые копии в порядке предпочтения: расширение файла -> Content-Encoding
+PRECOMPRESSED = [
+    (".br", "br"),
+    (".gz", "gzip"),
+]
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_STATIC_URL_RE = re.compile(r"/static/([\w./-]+)")
+
+# Исходный путь ассета -> путь собранной копии относительно static
+_manifest: Dict[str, str] = {}
+
+
+def asset_url(path: str) -> str:
+    """URL ассета для шаблонов: версия с хэшем, если ассеты собраны, иначе исходный файл"""
+    built = _manifest.get(path)
+    return f"/static/{built}" if built else f"/static/{path}"
+
+
+def _write_atomic(file_path: str, data: bytes):
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+
+
+def _rewrite_urls(content: bytes, manifest: Dict[str, str]) -> bytes:
+    """Заменить ссылки /static/... внутри CSS на версии с хэшем"""
+    def replace(match):
+        built = manifest.get(match.group(1))
+        return f"/static/{built}" if built else match.group(0)
+    return _STATIC_URL_RE.sub(replace, content.decode("utf-8")).encode("utf-8")
+
+
+def build_assets() -> Dict[str, str]:
+    """Собрать ассеты: копии с хэшем содержимого в имени и сжатые .gz/.br рядом.
+
+    Уже собранные файлы не перезаписываются, устаревшие версии удаляются,
+    поэтому повторный вызов (перезапуск, несколько воркеров) только считает хэши.
+    """
+    global _manifest
+    if not settings.static_fingerprint:
+        _manifest = {}
+        return _manifest
+
+    manifest: Dict[str, str] = {}
+    built_files = set()
+    for path in ASSET_FILES:
+        source = os.path.join(STATIC_DIR, path)
+        if not os.path.exists(source):
+            continue
+        with open(source, "rb") as f:
+            content = f.read()
+        if path.endswith(".css"):
+            content = _rewrite_urls(content, manifest)
+
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        base, ext = os.path.splitext(path)
+        built = f"{base}.{digest}{ext}"
+        target = os.path.join(BUILD_DIR, built)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write_atomic(f"{target}.gz", gzip.compress(content, compresslevel=9, mtime=0))
+            _write_atomic(f"{target}.br", brotli.compress(content, quality=11))
+            _write_atomic(target, content)
+        manifest[path] = f"build/{built}"
+        built_files.update({built, f"{built}.gz", f"{built}.br"})
+
+    # Удаление версий, оставшихся от прошлых сборок
+    for root, _, files in os.walk(BUILD_DIR):
+        for name in files:
+            rel_path = os.path.relpath(os.path.join(root, name), BUILD_DIR).replace(os.sep, "/")
+            if rel_path not in built_files and not name.endswith(".tmp"):
+                os.remove(os.path.join(root, name))
+
+    _manifest = manifest
+    return manifest
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Кодировки из Accept-Encoding с ненулевым q"""
+    encodings = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles, отдающий собранные ассеты сжатыми и с неизменяемым кэшированием.
+
+    Для файлов из build/ выбирается .br или .gz копия по Accept-Encoding,
+    остальные файлы (загрузки, иконки) отдаются как в StaticFiles.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        build_dir = os.path.realpath(BUILD_DIR)
+        if os.path.commonpath([os.path.realpath(full_path), build_dir]) != build_dir:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        encodings = accepted_encodings(request_headers.get("accept-encoding", ""))
+        serve_path, serve_stat = full_path, stat_result
+        for suffix, encoding in PRECOMPRESSED:
+            if encoding in encodings and os.path.exists(f"{full_path}{suffix}"):
+                serve_path = f"{full_path}{suffix}"
+                serve_stat = os.stat(serve_path)
+                headers["Content-Encoding"] = encoding
+                break
+
+        # Тип содержимого определяется по исходному имени, а не по .br/.gz
+        response = FileResponse(
+            serve_path,
+            status_code=status_code,
+            stat_result=serve_stat,
+            headers=headers,
+            media_type=mimetypes.guess_type(str(full_path))[0] or "application/octet-stream",
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,140 @@
+"""Контентно-адресуемое хранилище загрузок и учет ссылок проектов на файлы.
+
+Файл хранится по SHA-256 содержимого в uploads/blobs/ab/cd/<sha256><расширение>:
+одинаковые изображения и макеты занимают место один раз, одноименные файлы не
+перезаписывают друг друга, а в одной директории не больше нескольких файлов даже
+при сотнях тысяч загрузок. Ссылки проектов на файлы хранятся в project_uploads;
+файлы без ссылок убирает фоновая сверка (app/upload_gc.py).
+"""
+import hashlib
+import os
+import re
+import tempfile
+from typing import BinaryIO, Iterable, List, Set
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import Project, ProjectUpload, SessionLocal
+from app.images import upload_file_path
+
+
+BLOB_PREFIX = "uploads/blobs/"
+
+_CHUNK_SIZE = 1024 * 1024
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,10}$")
+# Сигнатуры форматов изображений: расширение берется из содержимого, чтобы одинаковые
+# файлы с разными именами (screen.png и copy.PNG, фото .jpg и .jpeg) попадали в один путь
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+]
+
+# mkstemp создает файл с правами 0600 — файлы хранилища получают обычные права с учетом umask
+_umask = os.umask(0)
+os.umask(_umask)
+_FILE_MODE = 0o666 & ~_umask
+
+
+def blob_static_path(digest: str, extension: str = "") -> str:
+    """Путь файла в хранилище: два уровня по 256 поддиректорий из первых символов хэша"""
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def _extension(head: bytes, filename: str) -> str:
+    """Расширение файла в хранилище (нужно статике для Content-Type): по сигнатуре, иначе из исходного имени"""
+    for signature, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if _EXTENSION.match(extension) else ""
+
+
+def store_blob(source: BinaryIO, filename: str) -> tuple[str, int]:
+    """Сохранить поток в хранилище и вернуть (путь uploads/..., размер).
+
+    Хэш считается во время записи во временный файл, затем файл атомарно
+    переносится на место. Если такое содержимое уже есть, копия удаляется,
+    а у существующего файла обновляется mtime: сверка не трогает файлы моложе
+    UPLOAD_GC_MIN_AGE, пока ссылающийся на них проект еще не сохранен.
+    """
+    tmp_dir = os.path.join(settings.upload_dir, "blobs", "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        digest = hashlib.sha256()
+        head = b""
+        size = 0
+        with os.fdopen(fd, "wb") as f:
+            while chunk := source.read(_CHUNK_SIZE):
+                if not size:
+                    head = chunk[:16]
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        path = blob_static_path(digest.hexdigest(), _extension(head, filename))
+        file_path = upload_file_path(path)
+        if os.path.exists(file_path):
+            os.utime(file_path)
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            os.chmod(tmp_path, _FILE_MODE)
+            os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path, size
+
+
+def project_upload_paths(project: Project) -> Set[str]:
+    """Загруженные файлы, на которые ссылается проект: изображения и макеты"""
+    return upload_paths(project.get_images_list() + project.get_mockups_list())
+
+
+def upload_paths(paths: Iterable[str]) -> Set[str]:
+    """Пути загруженных файлов среди путей изображений и макетов (внешние ссылки не учитываются)"""
+    return {path for path in paths if path.startswith("uploads/")}
+
+
+async def sync_projects_uploads(db: AsyncSession, projects: Iterable[Project]):
+    """Заменить ссылки проектов на файлы одним DELETE и одним INSERT — в транзакции записи проектов"""
+    projects = list(projects)
+    rows = [{"project_id": p.id, "path": path} for p in projects for path in sorted(project_upload_paths(p))]
+    await replace_projects_uploads(db, [p.id for p in projects], rows)
+
+
+async def replace_projects_uploads(db: AsyncSession, project_ids: List[int], rows: List[dict]):
+    """Заменить ссылки проектов на файлы готовыми строками {"project_id", "path"}"""
+    await db.execute(delete(ProjectUpload).where(ProjectUpload.project_id.in_(project_ids)))
+    if rows:
+        await db.execute(insert(ProjectUpload.__table__), rows)
+
+
+async def remove_project_uploads(db: AsyncSession, project_id: int):
+    """Удалить ссылки проекта на файлы"""
+    await db.execute(delete(ProjectUpload).where(ProjectUpload.project_id == project_id))
+
+
+def rebuild_upload_index() -> int:
+    """Пересобрать ссылки на файлы по всем проектам (при старте и после скриптов), вернуть число строк"""
+    db = SessionLocal()
+    try:
+        db.execute(delete(ProjectUpload))
+        rows = [
+            {"project_id": project.id, "path": path}
+            for project in db.scalars(select(Project))
+            for path in sorted(project_upload_paths(project))
+        ]
+        if rows:
+            db.execute(insert(ProjectUpload), rows)
+        db.commit()
+        return len(rows)
+    finally:
+        db.close()
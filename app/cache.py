@@ -0,0 +1,116 @@
+"""Кэш отрендеренных публичных страниц с инвалидацией по версии данных"""
+import os
+from collections import OrderedDict
+from threading import Lock
+from typing import Hashable, Optional
+
+from app.config import settings
+
+
+class PageCache:
+    """LRU-кэш готового HTML, ключ записи включает версию данных.
+
+    Если задан version_file, изменение данных отмечается заменой этого файла,
+    и кэши всех воркеров сбрасываются, заметив новый файл.
+    """
+
+    def __init__(self, max_entries: int = 32, version_file: Optional[str] = None):
+        self.max_entries = max_entries
+        self.version_file = version_file
+        self._entries: "OrderedDict[tuple, str]" = OrderedDict()
+        self._version = 0
+        self._file_signature: Optional[tuple] = None
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _read_signature(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.version_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _sync_version(self):
+        """Подхватить изменение данных из другого процесса (вызывается под блокировкой)"""
+        if not self.version_file:
+            return
+        signature = self._read_signature()
+        if signature != self._file_signature:
+            self._file_signature = signature
+            self._version += 1
+            self._entries.clear()
+
+    @property
+    def version(self) -> int:
+        """Текущая версия данных"""
+        with self._lock:
+            self._sync_version()
+            return self._version
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """Получить HTML для текущей версии данных"""
+        with self._lock:
+            self._sync_version()
+            entry_key = (key, self._version)
+            html = self._entries.get(entry_key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return html
+
+    def set(self, key: Hashable, html: str, version: int):
+        """Сохранить HTML, отрендеренный из данных версии version.
+
+        Версию нужно запомнить до чтения из БД: если за время рендера
+        данные изменились, устаревшая страница в кэш не попадет.
+        """
+        with self._lock:
+            if version != self._version:
+                return
+            entry_key = (key, version)
+            self._entries[entry_key] = html
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump_version(self) -> int:
+        """Увеличить версию данных и сбросить устаревшие записи"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            if self.version_file:
+                # Атомарная замена дает новый inode — другие процессы заметят изменение
+                os.makedirs(os.path.dirname(self.version_file) or ".", exist_ok=True)
+                tmp_path = f"{self.version_file}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(str(self._version))
+                os.replace(tmp_path, self.version_file)
+                self._file_signature = self._read_signature()
+            return self._version
+
+    def stats(self) -> dict:
+        """Статистика кэша"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+page_cache = PageCache(
+    max_entries=settings.page_cache_max_entries,
+    version_file=settings.page_cache_version_file,
+)
+
+
+def bump_data_version() -> int:
+    """Отметить изменение данных портфолио — вызывается после каждой записи в админке"""
+    return page_cache.bump_version()
@@ -0,0 +1,159 @@
+"""Командная строка приложения: запуск сервера и обслуживание"""
+import argparse
+import importlib.util
+import os
+import shutil
+from typing import Optional
+
+from app.config import settings
+
+
+def available_cpus() -> int:
+    """Количество ядер, доступных процессу, с учетом cpuset и квоты CPU контейнера (cgroup v2)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def prepare():
+    """Однократная подготовка перед запуском воркеров: миграции, render_data, индексы технологий и файлов, ассеты, шаблоны, статическая версия"""
+    from app.assets import build_assets
+    from app.blobs import rebuild_upload_index
+    from app.database import init_db
+    from app.jobs import fail_unfinished_jobs
+    from app.prerender import run_prerender
+    from app.tech_index import rebuild_tech_index
+    from app.templating import precompile_templates
+    from app.utils import backfill_project_render_data
+
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    init_db()
+    updated = backfill_project_render_data()
+    if updated:
+        print(f"Обновлены данные для рендера {updated} проектов")
+    rebuild_tech_index()
+    rebuild_upload_index()
+    interrupted = fail_unfinished_jobs()
+    if interrupted:
+        print(f"Прерваны задачи генерации прошлого запуска: {interrupted}")
+    build_assets()
+    precompile_templates()
+    if settings.prerender_dir:
+        run_prerender(settings.prerender_dir)
+
+
+def prepare_metrics_dir():
+    """Общая директория метрик воркеров: /metrics любого воркера суммирует значения всех процессов.
+
+    Файлы прошлого запуска удаляются, иначе счетчики завершенных процессов попадут в сумму.
+    Переменная задается до запуска воркеров: prometheus_client читает ее при импорте.
+    """
+    shutil.rmtree(settings.metrics_dir, ignore_errors=True)
+    os.makedirs(settings.metrics_dir)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.abspath(settings.metrics_dir)
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None, workers: Optional[int] = None, reload: bool = False):
+    """Запустить uvicorn: несколько воркеров в продакшене, один процесс с reload для разработки"""
+    import uvicorn
+
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+    if reload:
+        # Reload следит за файлами и перезапускает единственный процесс — только для разработки
+        workers = 1
+        os.environ.setdefault("TEMPLATES_AUTO_RELOAD", "true")
+    else:
+        workers = workers or settings.workers or available_cpus()
+        prepare()
+        # Воркеры не повторяют миграции, выполненные выше
+        os.environ["RUN_MIGRATIONS_ON_STARTUP"] = "false"
+        if settings.metrics_enabled:
+            prepare_metrics_dir()
+
+    print(f"Запуск: воркеров {workers}, event loop {loop}, HTTP парсер {http}{', reload' if reload else ''}")
+    uvicorn.run(
+        "app.main:app",
+        host=host or settings.host,
+        port=port or settings.port,
+        workers=None if reload else workers,
+        reload=reload,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=settings.keep_alive_timeout,
+        timeout_graceful_shutdown=settings.graceful_shutdown_timeout,
+    )
+
+
+def main(argv: Optional[list[str]] = None):
+    """Точка входа: python main.py <команда>"""
+    parser = argparse.ArgumentParser(prog="main.py", description="Alteran Portfolio")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="запустить сервер")
+    serve_parser.add_argument("--host", help=f"адрес (по умолчанию HOST={settings.host})")
+    serve_parser.add_argument("--port", type=int, help=f"порт (по умолчанию PORT={settings.port})")
+    serve_parser.add_argument("--workers", type=int, help="количество воркеров (по умолчанию WORKERS или число ядер)")
+    serve_parser.add_argument("--reload", action="store_true", help="перезапуск при изменении кода, один процесс (только для разработки)")
+
+    subparsers.add_parser("migrate", help="выполнить миграции БД и собрать ассеты")
+
+    prerender_parser = subparsers.add_parser("prerender", help="отрендерить статическую версию публичного сайта")
+    prerender_parser.add_argument("--output", help="директория (по умолчанию PRERENDER_DIR)")
+
+    export_parser = subparsers.add_parser("export", help="выгрузить проекты и доработки в NDJSON")
+    export_parser.add_argument("output", help="файл (.ndjson, с --files — .tar)")
+    export_parser.add_argument("--files", action="store_true", help="добавить загруженные изображения и макеты (tar архив)")
+
+    import_parser = subparsers.add_parser("import", help="загрузить NDJSON или tar архив из export")
+    import_parser.add_argument("source", help="файл .ndjson или .tar")
+
+    gc_parser = subparsers.add_parser("gc-uploads", help="сверить загруженные файлы со ссылками проектов: карантин и удаление файлов без ссылок")
+    gc_parser.add_argument("--dry-run", action="store_true", help="только отчет, без переноса и удаления файлов")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(host=args.host, port=args.port, workers=args.workers, reload=args.reload)
+    elif args.command == "migrate":
+        prepare()
+    elif args.command == "prerender":
+        output = args.output or settings.prerender_dir
+        if not output:
+            parser.error("укажите --output или PRERENDER_DIR")
+        from app.assets import build_assets
+        from app.prerender import run_prerender
+
+        # Ссылки на ассеты в HTML должны указывать на версии с хэшем
+        build_assets()
+        print(f"Статическая версия сайта: {run_prerender(output)}")
+    elif args.command == "export":
+        from app.transfer import run_export
+
+        run_export(args.output, include_files=args.files)
+        print(f"Портфолио выгружено в {args.output}")
+    elif args.command == "import":
+        from app.database import init_db
+        from app.transfer import run_import
+
+        init_db()
+        stats = run_import(args.source)
+        print("Импорт завершен: " + ", ".join(f"{name} {count}" for name, count in stats.items()))
+    elif args.command == "gc-uploads":
+        from app.upload_gc import run_reconcile
+
+        report = run_reconcile(dry_run=args.dry_run)
+        if report is None:
+            print("Сверка уже выполняется другим процессом")
+        else:
+            for item in report["dangling"]:
+                print(f"Нет файла {item['path']} (проекты {', '.join(map(str, item['projects']))})")
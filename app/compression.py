@@ -0,0 +1,137 @@
+"""Сжатие HTML и JSON ответов gzip/brotli с кэшем сжатых тел"""
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.assets import accepted_encodings
+from app.config import settings
+
+
+# Сжимаются только текстовые ответы приложения: статика уже сжата заранее, изображения не сжимаются
+COMPRESSIBLE_TYPES = ("text/html", "application/json")
+
+
+class CompressedBodyCache:
+    """LRU-кэш сжатых тел: ключ — кодировка и sha256 исходного тела"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, str]) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def set(self, key: tuple[str, str], body: bytes):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Статистика кэша"""
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": sum(len(body) for body in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class CompressionMiddleware:
+    """ASGI middleware: сжимает HTML и JSON ответы по Accept-Encoding (brotli предпочтительнее gzip).
+
+    Сжимаются только ответы целиком (без потоковой передачи) не меньше minimum_size
+    байт. Одинаковые тела — например, закэшированная главная страница — сжимаются
+    один раз, дальше сжатые байты берутся из CompressedBodyCache.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache: CompressedBodyCache,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+    ):
+        self.app = app
+        self.cache = cache
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encodings = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        encoding = "br" if "br" in encodings else "gzip" if "gzip" in encodings else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            content_type = headers.get("content-type", "")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or len(body) < self.minimum_size
+            ):
+                # Потоковые, уже сжатые, нетекстовые и маленькие ответы идут как есть
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        key = (encoding, hashlib.sha256(body).hexdigest())
+        compressed = self.cache.get(key)
+        if compressed is None:
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=self.brotli_quality)
+            else:
+                compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+            self.cache.set(key, compressed)
+        return compressed
+
+
+compressed_body_cache = CompressedBodyCache(max_entries=settings.compression_cache_entries)
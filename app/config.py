@@ -17,22 +17,220 @@ class Settings(BaseSettings):
     database_url: str = "sqlite:///./projects.db"
     """URL подключения к базе данных"""
     
+    async_database_url: Optional[str] = None
+    """URL для асинхронного движка. По умолчанию выводится из database_url (sqlite -> sqlite+aiosqlite)"""
+    
+    # Профиль SQLite (применяется к каждому соединению)
+    sqlite_wal: bool = True
+    """Режим журнала WAL: чтение не блокируется записью"""
+    
+    sqlite_synchronous: str = "NORMAL"
+    """PRAGMA synchronous: NORMAL безопасен в WAL и не делает fsync на каждую транзакцию"""
+    
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    """PRAGMA mmap_size в байтах: чтение файла БД через отображение в память"""
+    
+    sqlite_cache_size: int = -64000
+    """PRAGMA cache_size: отрицательное значение — размер кэша страниц в КиБ"""
+    
+    sqlite_busy_timeout: int = 5000
+    """PRAGMA busy_timeout в миллисекундах: ожидание блокировки вместо ошибки database is locked"""
+    
+    sqlite_temp_store: str = "MEMORY"
+    """PRAGMA temp_store: временные таблицы и индексы в памяти"""
+    
+    sqlite_read_pool_size: int = 5
+    """Количество соединений пула чтения"""
+    
+    sqlite_writer_timeout: int = 30
+    """Сколько секунд запись ждет освобождения единственного пишущего соединения"""
+    
     # Файлы
     upload_dir: str = "app/static/uploads"
     """Директория для загрузки файлов"""
     
+    mockups_max_total_size: int = 1024 * 1024 * 1024
+    """Максимальный суммарный размер распакованных макетов из zip архива в байтах"""
+    
+    mockups_max_members: int = 1000
+    """Максимальное количество файлов в zip архиве макетов"""
+    
+    mockups_max_ratio: int = 100
+    """Максимальная степень сжатия файла в архиве макетов (защита от zip-бомб)"""
+    
+    mockups_extract_workers: int = 4
+    """Количество потоков для распаковки макетов"""
+    
+    image_workers: int = 2
+    """Количество процессов для построения адаптивных WebP версий изображений"""
+    
+    image_quality: int = 80
+    """Качество WebP версий изображений (0-100)"""
+    
+    # Статика
+    static_fingerprint: bool = True
+    """Отдавать CSS/JS/шрифт из сборки с хэшем в имени и immutable кэшем. В разработке можно отключить, чтобы правки применялись без перезапуска"""
+    
+    # Шаблоны
+    templates_auto_reload: bool = False
+    """Проверять изменение файлов шаблонов при каждом рендере (для разработки, serve --reload включает автоматически)"""
+    
+    template_cache_dir: str = ".cache/jinja"
+    """Директория кэша байткода скомпилированных шаблонов"""
+    
     # CORS
     cors_origins: str = "*"
     """Разрешенные источники для CORS. Для продакшена указать конкретные домены через запятую"""
     
+    # Кэш страниц
+    page_cache_max_entries: int = 32
+    """Максимальное количество отрендеренных страниц в кэше"""
+    
+    page_cache_version_file: str = ".cache/data_version"
+    """Файл-метка изменения данных: через него сбрасываются кэши страниц во всех воркерах"""
+    
+    # Статическая версия сайта
+    prerender_dir: str = ""
+    """Директория статической версии главной и /api/projects, обновляемой после каждой записи в админке (пусто — выключено)"""
+    
+    prerender_keep_releases: int = 3
+    """Сколько последних версий хранить в PRERENDER_DIR/releases"""
+    
+    # Сжатие ответов
+    compression_minimum_size: int = 500
+    """Минимальный размер HTML/JSON ответа в байтах, начиная с которого он сжимается"""
+    
+    compression_cache_entries: int = 64
+    """Количество сжатых тел ответов в кэше (одинаковые ответы не сжимаются повторно)"""
+    
+    compression_gzip_level: int = 6
+    """Уровень сжатия gzip (1-9)"""
+    
+    compression_brotli_quality: int = 5
+    """Качество сжатия brotli (0-11)"""
+    
+    # JSON API
+    api_page_size: int = 20
+    """Размер страницы /api/projects по умолчанию"""
+    
+    api_max_page_size: int = 100
+    """Максимальный размер страницы /api/projects"""
+    
+    tweaks_page_size: int = 12
+    """Количество доработок, отображаемых на главной сразу и подгружаемых за один запрос /api/tweaks"""
+    
+    # Импорт и экспорт
+    transfer_batch_size: int = 1000
+    """Размер пакета при импорте и экспорте NDJSON (строк на один executemany / одну выборку)"""
+    
+    # Метрики
+    metrics_enabled: bool = True
+    """Отдавать метрики Prometheus на /metrics и собирать время запросов, SQL и рендера шаблонов"""
+    
+    metrics_dir: str = ".cache/metrics"
+    """Директория файлов метрик воркеров (PROMETHEUS_MULTIPROC_DIR), serve очищает ее при запуске"""
+    
+    # Профилирование
+    profiling_enabled: bool = False
+    """Разрешить админу получать flame graph отдельного запроса по заголовку X-Profile"""
+    
+    profiling_interval: float = 0.005
+    """Интервал сэмплирования стека при профилировании и для журнала медленных запросов, секунды"""
+    
+    slow_request_threshold: float = 0
+    """Записывать в журнал запросы дольше этого времени, секунды (0 — журнал выключен)"""
+    
+    slow_request_log: str = ".cache/slow_requests.jsonl"
+    """Журнал медленных запросов: маршрут, SQL с временем и самые частые стеки, JSON на строку"""
+    
+    # Сверка загрузок
+    upload_gc_interval: int = 3600
+    """Интервал фоновой сверки загруженных файлов со ссылками проектов в секундах (0 — только командой gc-uploads)"""
+    
+    upload_gc_batch_size: int = 1000
+    """Файлов и путей из БД на один пакет сверки"""
+    
+    upload_gc_min_age: int = 600
+    """Файл без ссылок моложе этого (в секундах) не трогается: ссылающийся на него проект мог еще не сохраниться"""
+    
+    upload_gc_grace_hours: int = 72
+    """Сколько часов файл без ссылок лежит в карантине до удаления"""
+    
+    upload_quarantine_dir: str = ".cache/upload_quarantine"
+    """Директория карантина (вне статики), в ней же отчет последней сверки report.json"""
+    
     # OpenAI
     openai_key: Optional[str] = None
     """API ключ OpenAI для генерации проектов через LLM"""
     
-    # Порт приложения
+    llm_model: str = "gpt-4o-mini"
+    """Модель OpenAI для генерации"""
+    
+    llm_temperature: float = 0.7
+    """Температура генерации"""
+    
+    llm_timeout: float = 60.0
+    """Таймаут одного запроса к OpenAI в секундах"""
+    
+    llm_workers: int = 2
+    """Количество одновременных задач генерации в процессе"""
+    
+    llm_queue_size: int = 20
+    """Максимальное количество задач генерации в очереди"""
+    
+    llm_job_retention_hours: int = 24
+    """Сколько часов хранить завершенные задачи генерации"""
+    
+    llm_cache_enabled: bool = True
+    """Кэшировать ответы LLM для одинаковых запросов"""
+    
+    llm_cache_path: str = ".cache/llm_cache.sqlite3"
+    """Файл SQLite с кэшем ответов LLM"""
+    
+    llm_cache_max_entries: int = 500
+    """Максимальное количество ответов в кэше LLM"""
+    
+    llm_cache_max_bytes: int = 20 * 1024 * 1024
+    """Максимальный суммарный размер ответов в кэше LLM в байтах"""
+    
+    # GitHub API
+    github_api_url: str = "https://api.github.com"
+    """Базовый URL GitHub API (для тестов можно указать локальный сервер)"""
+    
+    github_token: Optional[str] = None
+    """Токен GitHub для повышенного лимита запросов (опционально)"""
+    
+    github_cache_dir: str = ".cache/github"
+    """Директория дискового кэша ответов GitHub API"""
+    
+    github_cache_ttl: int = 60
+    """Сколько секунд ответ считается свежим, после — перепроверка через If-None-Match"""
+    
+    github_rate_limit_threshold: int = 5
+    """При X-RateLimit-Remaining не выше порога запросы в сеть приостанавливаются"""
+    
+    github_max_backoff: float = 30.0
+    """Максимальное ожидание сброса лимита GitHub API в секундах"""
+    
+    # Сервер (python main.py serve)
+    host: str = "0.0.0.0"
+    """Адрес, на котором слушает сервер"""
+    
     port: int = 8000
     """Порт для запуска приложения"""
     
+    workers: int = 0
+    """Количество процессов-воркеров. 0 — по числу доступных контейнеру ядер"""
+    
+    keep_alive_timeout: int = 5
+    """Сколько секунд держать простаивающее keep-alive соединение"""
+    
+    graceful_shutdown_timeout: int = 30
+    """Сколько секунд при остановке ждать завершения текущих запросов"""
+    
+    run_migrations_on_startup: bool = True
+    """Выполнять миграции при старте приложения. serve выполняет их один раз до запуска воркеров и отключает в воркерах"""
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         case_sensitive=False,
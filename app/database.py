@@ -1,24 +1,112 @@
 """База данных и модели SQLAlchemy"""
-from typing import Annotated
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from typing import Annotated, Optional
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, DateTime, Index, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from fastapi import Depends
 from datetime import datetime
 import json
 
 from app.config import settings
+from app.metrics import instrument_engine
+from app.profiling import trace_engine_queries
+
+IS_SQLITE = settings.database_url.startswith("sqlite")
+
+
+def apply_sqlite_pragmas(dbapi_connection, read_only: bool = False):
+    """Профиль SQLite из настроек: WAL, synchronous, mmap, кэш страниц, busy_timeout, temp_store.
+
+    Соединения пула чтения дополнительно переводятся в query_only.
+    """
+    pragmas = [
+        f"busy_timeout = {settings.sqlite_busy_timeout}",
+        f"synchronous = {settings.sqlite_synchronous}",
+        f"mmap_size = {settings.sqlite_mmap_size}",
+        f"cache_size = {settings.sqlite_cache_size}",
+        f"temp_store = {settings.sqlite_temp_store}",
+    ]
+    if read_only:
+        pragmas.append("query_only = ON")
+    elif settings.sqlite_wal:
+        # Режим журнала хранится в файле БД, его переключает пишущее соединение
+        pragmas.insert(1, "journal_mode = WAL")
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            cursor.execute(f"PRAGMA {pragma}")
+    finally:
+        cursor.close()
+
+
+def _register_sqlite_pragmas(sync_engine, read_only: bool = False):
+    if not IS_SQLITE:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, read_only=read_only)
+
 
 # Создание движка базы данных
 engine = create_engine(
     settings.database_url,
     connect_args={"check_same_thread": False}  # Для SQLite
 )
+_register_sqlite_pragmas(engine)
+instrument_engine(engine, "sync")
+trace_engine_queries(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def get_async_database_url() -> str:
+    """URL для асинхронного движка — явный из настроек или выведенный из database_url"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = settings.database_url
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+# Асинхронный движок записи. Для SQLite — одно соединение на процесс: изменения
+# выполняются последовательно и не получают "database is locked" друг от друга
+async_engine = create_async_engine(
+    get_async_database_url(),
+    **({"pool_size": 1, "max_overflow": 0, "pool_timeout": settings.sqlite_writer_timeout} if IS_SQLITE else {}),
+)
+_register_sqlite_pragmas(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine, "writer")
+trace_engine_queries(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False,  # объекты остаются доступны шаблонам после commit
+)
+
+# Асинхронный движок чтения для публичных страниц и просмотра в админке.
+# В WAL читатели не ждут запись, соединения работают в режиме query_only
+async_read_engine = create_async_engine(
+    get_async_database_url(),
+    **({"pool_size": settings.sqlite_read_pool_size, "max_overflow": 0} if IS_SQLITE else {}),
+)
+_register_sqlite_pragmas(async_read_engine.sync_engine, read_only=True)
+instrument_engine(async_read_engine.sync_engine, "reader")
+trace_engine_queries(async_read_engine.sync_engine)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
 class Project(Base):
     """Модель проекта"""
     __tablename__ = "projects"
@@ -33,10 +121,19 @@ class Project(Base):
     tech_stack = Column(Text, nullable=False)  # JSON строка со стеком технологий
     images = Column(Text, nullable=True)  # JSON строка со списком путей к изображениям
     mockups = Column(Text, nullable=True)  # JSON строка со списком путей к макетам (из zip архива)
+    image_meta = Column(Text, nullable=True)  # JSON строка: путь изображения/макета -> размеры и WebP версии
+    render_data = Column(Text, nullable=True)  # JSON строка с готовыми для шаблона данными (строится при записи)
     github_url = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Ключ курсорной пагинации /api/projects
+        Index("ix_projects_created_at_id", "created_at", "id"),
+        # Натуральный ключ импорта: INSERT ... ON CONFLICT в app/transfer.py
+        Index("ux_projects_title_created_at", "title", "created_at", unique=True),
+    )
+
     def get_results_list(self) -> list[str]:
         """Получить список результатов"""
         if self.results:
@@ -84,6 +181,71 @@ class Project(Base):
         """Установить список макетов"""
         self.mockups = json.dumps(mockups, ensure_ascii=False) if mockups else None
 
+    def get_image_meta_dict(self) -> dict:
+        """Получить метаданные адаптивных версий изображений"""
+        if self.image_meta:
+            try:
+                return json.loads(self.image_meta)
+            except (json.JSONDecodeError, TypeError):
+                return {}
+        return {}
+
+    def set_image_meta_dict(self, image_meta: dict):
+        """Установить метаданные адаптивных версий изображений"""
+        self.image_meta = json.dumps(image_meta, ensure_ascii=False) if image_meta else None
+
+    def get_render_data_dict(self) -> dict:
+        """Получить готовые для шаблона данные проекта"""
+        if self.render_data:
+            try:
+                return json.loads(self.render_data)
+            except (json.JSONDecodeError, TypeError):
+                return {}
+        return {}
+
+    def set_render_data_dict(self, render_data: dict):
+        """Установить готовые для шаблона данные проекта"""
+        self.render_data = json.dumps(render_data, ensure_ascii=False)
+
+
+class ProjectTech(Base):
+    """Технология проекта — нормализованная строка из tech_stack для фильтрации в SQL"""
+    __tablename__ = "project_tech"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    category_key = Column(String, primary_key=True)  # Категория в нижнем регистре
+    tag_key = Column(String, primary_key=True)  # Технология в нижнем регистре
+    category = Column(String, nullable=False)  # Категория как в tech_stack ("Frontend")
+    tag = Column(String, nullable=False)  # Технология как в tech_stack ("React")
+
+    __table_args__ = (
+        Index("ix_project_tech_tag_key", "tag_key", "project_id"),
+        Index("ix_project_tech_category_key", "category_key", "project_id"),
+    )
+
+
+class ProjectUpload(Base):
+    """Ссылка проекта на загруженный файл (изображение или макет); файл удаляется, когда ссылок не осталось"""
+    __tablename__ = "project_uploads"
+
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    path = Column(String, primary_key=True)  # Путь uploads/... как в images и mockups
+
+    __table_args__ = (
+        # Количество ссылок на файл
+        Index("ix_project_uploads_path", "path", "project_id"),
+    )
+
+
+class TechFacet(Base):
+    """Предрассчитанное количество проектов по технологии или категории"""
+    __tablename__ = "tech_facets"
+
+    kind = Column(String, primary_key=True)  # tag, category
+    key = Column(String, primary_key=True)  # Ключ в нижнем регистре, значение для фильтра
+    name = Column(String, nullable=False)  # Название для отображения
+    count = Column(Integer, nullable=False)  # Количество проектов
+
 
 class Tweak(Base):
     """Модель мелкой доработки"""
@@ -98,6 +260,37 @@ class Tweak(Base):
     github_url = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Ключи пагинации /api/tweaks: вся лента и лента одной категории
+        Index("ix_tweaks_created_at_id", "created_at", "id"),
+        Index("ix_tweaks_category_created_at_id", "category", "created_at", "id"),
+        # Натуральный ключ импорта: INSERT ... ON CONFLICT в app/transfer.py
+        Index("ux_tweaks_title_created_at", "title", "created_at", unique=True),
+    )
+
+
+class GenerationJob(Base):
+    """Модель фоновой задачи генерации через LLM"""
+    __tablename__ = "generation_jobs"
+
+    id = Column(String, primary_key=True)  # uuid4 hex
+    kind = Column(String, nullable=False)  # project, project_github, tweak
+    status = Column(String, nullable=False, default="queued")  # queued, running, done, error
+    progress = Column(String, nullable=True)  # Текущий этап для отображения
+    payload = Column(Text, nullable=False)  # JSON строка с входными данными
+    result = Column(Text, nullable=True)  # JSON строка с результатом генерации
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def get_payload_dict(self) -> dict:
+        """Получить входные данные задачи"""
+        return json.loads(self.payload) if self.payload else {}
+
+    def get_result_dict(self) -> Optional[dict]:
+        """Получить результат задачи"""
+        return json.loads(self.result) if self.result else None
+
 
 def init_db():
     """Инициализация базы данных - создание таблиц"""
@@ -105,6 +298,48 @@ def init_db():
     run_migrations()
 
 
+def _separate_duplicate_keys(conn, table):
+    """Развести записи с одинаковыми (title, created_at) на микросекунды, чтобы построить уникальный индекс"""
+    from datetime import timedelta
+    from sqlalchemy import func, select, tuple_, update
+
+    model = Base.metadata.tables[table]
+    duplicates = (
+        select(model.c.title, model.c.created_at)
+        .where(model.c.created_at.is_not(None))
+        .group_by(model.c.title, model.c.created_at)
+        .having(func.count() > 1)
+    )
+    rows = conn.execute(
+        select(model.c.id, model.c.title, model.c.created_at)
+        .where(tuple_(model.c.title, model.c.created_at).in_(duplicates))
+        .order_by(model.c.title, model.c.created_at, model.c.id)
+    ).all()
+    previous, shift = None, 0
+    for row in rows:
+        key = (row.title, row.created_at)
+        shift = shift + 1 if key == previous else 0
+        previous = key
+        if shift:
+            conn.execute(
+                update(model).where(model.c.id == row.id).values(created_at=row.created_at + timedelta(microseconds=shift))
+            )
+    return len(rows)
+
+
+def _backfill_created_at(conn):
+    """Заполнить created_at у записей, вставленных в обход моделей: без даты ломается курсор пагинации (created_at, id)"""
+    from sqlalchemy import func, update
+
+    now = datetime.utcnow()
+    projects, tweaks = Base.metadata.tables["projects"], Base.metadata.tables["tweaks"]
+    conn.execute(
+        update(projects).where(projects.c.created_at.is_(None))
+        .values(created_at=func.coalesce(projects.c.updated_at, now))
+    )
+    conn.execute(update(tweaks).where(tweaks.c.created_at.is_(None)).values(created_at=now))
+
+
 def run_migrations():
     """Автоматические миграции — добавление недостающих колонок"""
     from sqlalchemy import inspect, text
@@ -115,6 +350,19 @@ def run_migrations():
         ("tweaks", "github_url", "TEXT"),
         ("projects", "github_url", "TEXT"),
         ("projects", "mockups", "TEXT"),
+        ("projects", "image_meta", "TEXT"),
+        ("projects", "render_data", "TEXT"),
+    ]
+    indexes = [
+        # (index, table, columns)
+        ("ix_projects_created_at_id", "projects", "created_at, id"),
+        ("ix_tweaks_created_at_id", "tweaks", "created_at, id"),
+        ("ix_tweaks_category_created_at_id", "tweaks", "category, created_at, id"),
+    ]
+    unique_indexes = [
+        # (index, table) — натуральный ключ (title, created_at) для upsert при импорте
+        ("ux_projects_title_created_at", "projects"),
+        ("ux_tweaks_title_created_at", "tweaks"),
     ]
 
     with engine.connect() as conn:
@@ -125,6 +373,28 @@ def run_migrations():
             if column not in existing:
                 conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}"))
                 conn.commit()
+        _backfill_created_at(conn)
+        conn.commit()
+        for index, table, columns in indexes:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index} ON {table} ({columns})"))
+            conn.commit()
+        for index, table in unique_indexes:
+            if index in {i["name"] for i in inspector.get_indexes(table)}:
+                continue
+            if _separate_duplicate_keys(conn, table):
+                print(f"{table}: записи с одинаковыми title и created_at разведены на микросекунды")
+            conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {table} (title, created_at)"))
+            conn.commit()
+        if IS_SQLITE:
+            from app.search import ensure_search_index
+            ensure_search_index(conn)
+            conn.commit()
+
+
+async def dispose_engines():
+    """Закрыть соединения асинхронных движков (остановка приложения, команды CLI)"""
+    await async_engine.dispose()
+    await async_read_engine.dispose()
 
 
 def get_db():
@@ -136,5 +406,19 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Получить асинхронную сессию базы данных (запись)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """Получить асинхронную сессию только для чтения"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+
 # Типизация для dependency injection
-SessionDep = Annotated[Session, Depends(get_db)]
\ No newline at end of file
+SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+AsyncReadSessionDep = Annotated[AsyncSession, Depends(get_async_read_db)]
\ No newline at end of file
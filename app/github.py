@@ -0,0 +1,230 @@
+"""Получение метаданных GitHub репозиториев: общий пул соединений, дисковый кэш с ETag, учет rate limit"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+from app.metrics import GITHUB_REQUEST_LATENCY
+
+
+class GitHubFetcher:
+    """Асинхронный клиент GitHub API с условными запросами и дисковым кэшем.
+
+    Ответ кэшируется на диске вместе с ETag. В пределах TTL запрос в сеть не
+    выполняется, после TTL отправляется If-None-Match и 304 лишь продлевает
+    запись. Когда X-RateLimit-Remaining опускается до порога, отдается
+    устаревший кэш, а без кэша — ожидание сброса лимита (не дольше max_backoff).
+    """
+
+    def __init__(
+        self,
+        api_url: str,
+        cache_dir: str,
+        ttl: int,
+        token: Optional[str] = None,
+        rate_limit_threshold: int = 5,
+        max_backoff: float = 30.0,
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.token = token
+        self.rate_limit_threshold = rate_limit_threshold
+        self.max_backoff = max_backoff
+        self._client: Optional[httpx.AsyncClient] = None
+        self._rate_remaining: Optional[int] = None
+        self._rate_reset: float = 0.0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Общий HTTP клиент с пулом соединений"""
+        if self._client is None:
+            headers = {
+                "Accept": "application/vnd.github.v3+json",
+                "User-Agent": "alteran-portfolio",
+            }
+            if self.token:
+                headers["Authorization"] = f"Bearer {self.token}"
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers=headers,
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+            )
+        return self._client
+
+    async def close(self):
+        """Закрыть HTTP клиент"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _cache_path(self, path: str) -> str:
+        key = hashlib.sha256(f"{self.api_url}{path}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_cache(self, path: str) -> Optional[dict]:
+        try:
+            with open(self._cache_path(path), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_cache(self, path: str, entry: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_path = self._cache_path(path)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+
+    def _update_rate_limit(self, response: httpx.Response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None and remaining.isdigit():
+            self._rate_remaining = int(remaining)
+        if reset is not None and reset.isdigit():
+            self._rate_reset = float(reset)
+
+    def _rate_limited(self) -> bool:
+        if self._rate_remaining is None or time.time() >= self._rate_reset:
+            return False
+        return self._rate_remaining <= self.rate_limit_threshold
+
+    async def get_json(self, path: str) -> Optional[dict]:
+        """GET к API с кэшем; None при ошибке или отсутствии ресурса"""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            data, outcome = await self._get_json(path)
+            return data
+        finally:
+            GITHUB_REQUEST_LATENCY.labels(endpoint_template(path), outcome).observe(time.perf_counter() - started)
+
+    async def _get_json(self, path: str) -> tuple[Optional[dict], str]:
+        """Ответ и исход запроса для метрики: cache, ok, not_modified, stale, rate_limited или error"""
+        entry = self._read_cache(path)
+        now = time.time()
+        if entry and now - entry["fetched_at"] < self.ttl:
+            return entry["data"], "cache"
+
+        if self._rate_limited():
+            if entry:
+                return entry["data"], "stale"
+            wait = self._rate_reset - now
+            if wait > self.max_backoff:
+                print(f"Лимит GitHub API исчерпан, сброс через {int(wait)} с")
+                return None, "rate_limited"
+            await asyncio.sleep(max(wait, 0))
+
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        response = await self._get_client().get(path, headers=headers)
+        self._update_rate_limit(response)
+
+        if response.status_code == 304 and entry:
+            entry["fetched_at"] = now
+            self._write_cache(path, entry)
+            return entry["data"], "not_modified"
+        if response.status_code == 200:
+            data = response.json()
+            self._write_cache(path, {
+                "etag": response.headers.get("ETag"),
+                "fetched_at": now,
+                "data": data,
+            })
+            return data, "ok"
+        # 403/429 при исчерпанном лимите — лучше устаревшие данные, чем ничего
+        if response.status_code in (403, 429) and entry:
+            return entry["data"], "stale"
+        return None, "error"
+
+
+def endpoint_template(path: str) -> str:
+    """Путь запроса к API без владельца и имени репозитория — метка метрики с ограниченным набором значений"""
+    parts = path.strip("/").split("/")
+    if len(parts) >= 3 and parts[0] == "repos":
+        return "/".join(["", "repos", "{owner}", "{repo}", *parts[3:]])
+    return "/" + parts[0] if parts[0] else "/"
+
+
+github_fetcher = GitHubFetcher(
+    api_url=settings.github_api_url,
+    cache_dir=settings.github_cache_dir,
+    ttl=settings.github_cache_ttl,
+    token=settings.github_token,
+    rate_limit_threshold=settings.github_rate_limit_threshold,
+    max_backoff=settings.github_max_backoff,
+)
+
+
+def parse_github_url(repo_url: str) -> Optional[tuple[str, str]]:
+    """Получить (owner, repo) из ссылки на репозиторий"""
+    # Поддерживаем форматы: https://github.com/owner/repo или github.com/owner/repo
+    repo_url = repo_url.strip()
+    if repo_url.startswith("http://") or repo_url.startswith("https://"):
+        parts = repo_url.replace("http://", "").replace("https://", "").split("/")
+    else:
+        parts = repo_url.split("/")
+
+    if len(parts) < 3 or parts[0] != "github.com":
+        return None
+
+    owner = parts[1]
+    repo = parts[2].replace(".git", "").split("#")[0].split("?")[0]
+    return owner, repo
+
+
+async def get_github_repo_info(repo_url: str) -> Optional[str]:
+    """Получить информацию о репозитории GitHub — метаданные и README запрашиваются параллельно"""
+    try:
+        parsed = parse_github_url(repo_url)
+        if not parsed:
+            return None
+        owner, repo = parsed
+
+        repo_data, readme_data = await asyncio.gather(
+            github_fetcher.get_json(f"/repos/{owner}/{repo}"),
+            github_fetcher.get_json(f"/repos/{owner}/{repo}/readme"),
+        )
+        if not repo_data:
+            return None
+
+        # Формирование описания репозитория
+        description_parts = []
+
+        if repo_data.get("description"):
+            description_parts.append(f"Описание: {repo_data['description']}")
+
+        if repo_data.get("name"):
+            description_parts.append(f"\nНазвание репозитория: {repo_data['name']}")
+
+        if readme_data and readme_data.get("content"):
+            try:
+                readme_content = base64.b64decode(readme_data["content"]).decode("utf-8")
+                # Ограничиваем размер README
+                readme_content = readme_content[:3000]
+                description_parts.append(f"\nREADME:\n{readme_content}")
+            except Exception:
+                pass
+
+        if repo_data.get("language"):
+            description_parts.append(f"\nОсновной язык: {repo_data['language']}")
+
+        if repo_data.get("topics"):
+            description_parts.append(f"\nТемы: {', '.join(repo_data['topics'])}")
+
+        if repo_data.get("homepage"):
+            description_parts.append(f"\nДомашняя страница: {repo_data['homepage']}")
+
+        return "\n".join(description_parts) if description_parts else None
+
+    except Exception as e:
+        print(f"Ошибка при получении информации о репозитории: {e}")
+        return None
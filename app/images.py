@@ -0,0 +1,123 @@
+"""Адаптивные версии изображений: уменьшенные WebP копии для srcset"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+
+# Ширины производных версий: превью в админке, карточка на лендинге, просмотр в модальном окне
+IMAGE_VARIANTS = {
+    "thumb": 320,
+    "card": 640,
+    "full": 1280,
+}
+
+
+def upload_file_path(static_path: str) -> str:
+    """Путь на диске для пути вида uploads/... из БД"""
+    return os.path.join(settings.upload_dir, static_path.removeprefix("uploads/"))
+
+
+def derived_static_path(static_path: str, width: int) -> str:
+    """Путь производной версии: uploads/derived/<исходный путь>_w<ширина>.webp"""
+    base, _ = os.path.splitext(static_path.removeprefix("uploads/"))
+    return f"uploads/derived/{base}_w{width}.webp"
+
+
+def _render_variants(source_file: str, targets: List[tuple], quality: int) -> Optional[dict]:
+    """Построить WebP версии одного изображения (выполняется в отдельном процессе).
+
+    targets — список (name, width, static_path, file_path). Метаданные (EXIF, ICC)
+    в WebP не переносятся. Изображение не увеличивается: версии шире оригинала
+    пропускаются, кроме самой маленькой.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(source_file) as im:
+            im = ImageOps.exif_transpose(im)
+            width, height = im.size
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA" if "A" in im.getbands() or im.mode == "P" else "RGB")
+
+            variants = []
+            for name, target_width, static_path, file_path in targets:
+                if target_width > width and variants:
+                    continue
+                resized = im.copy()
+                resized.thumbnail((target_width, target_width * 100), Image.Resampling.LANCZOS)
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                # Одинаковые загрузки хранятся одним файлом, и его версии могут отдаваться
+                # статикой во время пересборки — пишем во временный файл и заменяем атомарно
+                tmp_path = f"{file_path}.{os.getpid()}.tmp"
+                resized.save(tmp_path, "WEBP", quality=quality, method=4)
+                os.replace(tmp_path, file_path)
+                variants.append({
+                    "name": name,
+                    "path": static_path,
+                    "width": resized.width,
+                    "height": resized.height,
+                })
+            return {"width": width, "height": height, "variants": variants}
+    except Exception as e:
+        print(f"Не удалось обработать изображение {source_file}: {e}")
+        return None
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_image_pool() -> ProcessPoolExecutor:
+    """Пул процессов для обработки изображений, создается при первом обращении"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.image_workers)
+    return _pool
+
+
+def shutdown_image_pool():
+    """Остановить пул процессов"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+async def build_image_derivatives(paths: List[str]) -> Dict[str, dict]:
+    """Построить адаптивные версии для списка путей uploads/..., вернуть {путь: метаданные}"""
+    if not paths:
+        return {}
+    loop = asyncio.get_running_loop()
+    pool = get_image_pool()
+    tasks = []
+    for path in paths:
+        targets = [
+            (name, width, derived_static_path(path, width), upload_file_path(derived_static_path(path, width)))
+            for name, width in sorted(IMAGE_VARIANTS.items(), key=lambda item: item[1])
+        ]
+        tasks.append(loop.run_in_executor(
+            pool, _render_variants, upload_file_path(path), targets, settings.image_quality
+        ))
+    results = await asyncio.gather(*tasks)
+    return {path: meta for path, meta in zip(paths, results) if meta}
+
+
+def image_view(path: str, image_meta: Dict[str, dict]) -> dict:
+    """Данные для <img>: src карточки, srcset, размеры, превью и полноразмерная версия"""
+    meta = image_meta.get(path)
+    if not meta or not meta.get("variants"):
+        return {"path": path, "src": path, "srcset": None, "width": None, "height": None, "thumb": path, "full": path}
+    variants = meta["variants"]
+    by_name = {v["name"]: v for v in variants}
+    card = by_name.get("card", variants[-1])
+    return {
+        "path": path,
+        "src": card["path"],
+        "srcset": ", ".join(f"/static/{v['path']} {v['width']}w" for v in variants),
+        "width": card["width"],
+        "height": card["height"],
+        "thumb": variants[0]["path"],
+        "full": variants[-1]["path"],
+    }
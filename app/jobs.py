@@ -0,0 +1,251 @@
+"""Фоновые задачи генерации через LLM"""
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import delete, update
+
+from app.config import settings
+from app.database import AsyncSessionLocal, AsyncReadSessionLocal, GenerationJob, SessionLocal
+from app.github import get_github_repo_info
+from app.llm import generate_project_with_llm, generate_tweak_with_llm
+
+
+class JobQueueFull(Exception):
+    """Очередь задач генерации переполнена"""
+    pass
+
+
+ProgressCallback = Callable[[str], Awaitable[None]]
+
+INTERRUPTED_ERROR = "Задача прервана, запустите генерацию повторно"
+
+
+def project_form_data(generated_data: dict, github_url: Optional[str] = None) -> dict:
+    """Привести ответ LLM к данным формы проекта"""
+    return {
+        "title": generated_data.get("title", ""),
+        "industry": generated_data.get("industry", ""),
+        "results": generated_data.get("results", []),
+        "timeline": generated_data.get("timeline", ""),
+        "budget": generated_data.get("budget", ""),
+        "benefits": generated_data.get("benefits", ""),
+        "tech_stack": generated_data.get("tech_stack", {}),
+        "github_url": github_url,
+    }
+
+
+def tweak_form_data(generated_data: dict) -> dict:
+    """Привести ответ LLM к данным формы доработки"""
+    return {
+        "title": generated_data.get("title", ""),
+        "description": generated_data.get("description", ""),
+        "category": generated_data.get("category", "other"),
+        "project_name": generated_data.get("project_name"),
+        "time_spent": generated_data.get("time_spent"),
+        "github_url": generated_data.get("github_url"),
+    }
+
+
+async def _generate_project(payload: dict, progress: ProgressCallback) -> dict:
+    """Генерация проекта по текстовому описанию"""
+    await progress("Генерация описания проекта")
+    generated_data = await generate_project_with_llm(payload["description"])
+    return project_form_data(generated_data)
+
+
+async def _generate_project_from_github(payload: dict, progress: ProgressCallback) -> dict:
+    """Генерация проекта по GitHub репозиторию"""
+    await progress("Получение информации о репозитории")
+    repo_info = await get_github_repo_info(payload["github_url"])
+    if not repo_info:
+        raise ValueError("Не удалось получить информацию о репозитории. Проверьте URL.")
+    await progress("Генерация описания проекта")
+    generated_data = await generate_project_with_llm(repo_info)
+    return project_form_data(generated_data, github_url=payload["github_url"])
+
+
+async def _generate_tweak(payload: dict, progress: ProgressCallback) -> dict:
+    """Генерация доработки по текстовому описанию"""
+    await progress("Генерация описания доработки")
+    generated_data = await generate_tweak_with_llm(payload["description"])
+    return tweak_form_data(generated_data)
+
+
+# Обработчики задач по типу
+JOB_HANDLERS: Dict[str, Callable[[dict, ProgressCallback], Awaitable[dict]]] = {
+    "project": _generate_project,
+    "project_github": _generate_project_from_github,
+    "tweak": _generate_tweak,
+}
+
+
+def job_to_dict(job: GenerationJob) -> dict:
+    """Преобразовать задачу в словарь для API"""
+    status = job.status
+    error = job.error
+    # Выполняемая задача обновляется прогрессом и прерывается таймаутом wait_for: если ее никто
+    # не обновлял дольше двух таймаутов, воркер погиб. Задача в очереди может ждать сколько угодно —
+    # потерянные задачи очереди помечаются при остановке и запуске (fail_unfinished_jobs)
+    stale_after = timedelta(seconds=settings.llm_timeout * 2)
+    if status == "running" and job.updated_at < datetime.utcnow() - stale_after:
+        status = "error"
+        error = INTERRUPTED_ERROR
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": status,
+        "progress": job.progress if status in ("queued", "running") else None,
+        "result": job.get_result_dict(),
+        "error": error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    """Получить состояние задачи"""
+    async with AsyncReadSessionLocal() as db:
+        job = await db.get(GenerationJob, job_id)
+        return job_to_dict(job) if job else None
+
+
+def fail_unfinished_jobs() -> int:
+    """Пометить ошибкой задачи, оставшиеся в очереди или в работе от прошлого запуска.
+
+    Очередь живет в памяти процесса, поэтому вызывается однократно до запуска воркеров
+    (prepare или старт единственного процесса); возвращает число задач.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            update(GenerationJob)
+            .where(GenerationJob.status.in_(["queued", "running"]))
+            .values(status="error", progress=None, error=INTERRUPTED_ERROR, updated_at=datetime.utcnow())
+        )
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+async def _update_job(job_id: str, **fields):
+    """Обновить поля задачи в отдельной короткой сессии"""
+    async with AsyncSessionLocal() as db:
+        job = await db.get(GenerationJob, job_id)
+        if job is None:
+            return
+        for name, value in fields.items():
+            setattr(job, name, value)
+        job.updated_at = datetime.utcnow()
+        await db.commit()
+
+
+class JobQueue:
+    """Очередь задач генерации с ограниченным пулом воркеров"""
+
+    def __init__(self, workers: int, maxsize: int):
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        # Задачи этого процесса, которые еще не завершены (в очереди или выполняются)
+        self._unfinished: set[str] = set()
+
+    async def start(self):
+        """Запустить воркеры"""
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Остановить воркеры; задачи, оставшиеся в очереди и в работе, помечаются прерванными"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._unfinished:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(GenerationJob)
+                    .where(GenerationJob.id.in_(self._unfinished), GenerationJob.status.in_(["queued", "running"]))
+                    .values(status="error", progress=None, error=INTERRUPTED_ERROR, updated_at=datetime.utcnow())
+                )
+                await db.commit()
+            self._unfinished.clear()
+
+    async def submit(self, kind: str, payload: dict) -> str:
+        """Поставить задачу в очередь и вернуть ее id"""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Неизвестный тип задачи: {kind}")
+        if self._queue is None or self._queue.full():
+            raise JobQueueFull()
+
+        job = GenerationJob(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            status="queued",
+            progress="В очереди",
+            payload=json.dumps(payload, ensure_ascii=False),
+        )
+        async with AsyncSessionLocal() as db:
+            expired = datetime.utcnow() - timedelta(hours=settings.llm_job_retention_hours)
+            await db.execute(delete(GenerationJob).where(GenerationJob.created_at < expired))
+            db.add(job)
+            await db.commit()
+
+        try:
+            self._queue.put_nowait(job.id)
+            self._unfinished.add(job.id)
+        except asyncio.QueueFull:
+            await _update_job(job.id, status="error", progress=None, error="Очередь генерации переполнена")
+            raise JobQueueFull()
+        return job.id
+
+    async def _worker(self):
+        """Воркер: последовательно выполняет задачи из очереди"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+                self._unfinished.discard(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        """Выполнить одну задачу и сохранить результат"""
+        async with AsyncSessionLocal() as db:
+            job = await db.get(GenerationJob, job_id)
+            if job is None:
+                return
+            kind, payload = job.kind, job.get_payload_dict()
+
+        async def progress(message: str):
+            await _update_job(job_id, status="running", progress=message)
+
+        try:
+            result = await asyncio.wait_for(
+                JOB_HANDLERS[kind](payload, progress),
+                timeout=settings.llm_timeout * 2,
+            )
+        except asyncio.TimeoutError:
+            await _update_job(job_id, status="error", progress=None, error="Превышено время генерации")
+        except asyncio.CancelledError:
+            # Останавливается сам воркер — задача станет устаревшей; иначе отмена пришла
+            # из обработчика, и воркер должен продолжить работу
+            if asyncio.current_task().cancelling():
+                raise
+            await _update_job(job_id, status="error", progress=None, error="Генерация прервана")
+        except Exception as e:
+            await _update_job(job_id, status="error", progress=None, error=str(e))
+        else:
+            await _update_job(
+                job_id,
+                status="done",
+                progress=None,
+                result=json.dumps(result, ensure_ascii=False),
+            )
+
+
+job_queue = JobQueue(workers=settings.llm_workers, maxsize=settings.llm_queue_size)
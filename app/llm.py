@@ -1,84 +1,96 @@
 """Модуль для работы с LLM и генерации проектов и доработок"""
 from typing import Dict, Optional
+import json
+import time
 import httpx
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.config import settings
+from app.llm_cache import llm_cache
+from app.metrics import LLM_REQUEST_LATENCY
+
+
+# Общий клиент OpenAI с пулом соединений, создается при первом обращении
+_openai_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Получить общий асинхронный клиент OpenAI"""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(
+            api_key=settings.openai_key,
+            timeout=settings.llm_timeout,
+            http_client=httpx.AsyncClient(
+                timeout=settings.llm_timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.llm_workers * 2,
+                    max_keepalive_connections=settings.llm_workers,
+                ),
+            ),
+        )
+    return _openai_client
+
+
+async def close_openai_client():
+    """Закрыть общий клиент OpenAI"""
+    global _openai_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+
+
+async def complete_json(system: str, prompt: str, max_tokens: int) -> dict:
+    """Запрос к модели с ответом в формате JSON.
+
+    Ответы кэшируются в llm_cache, одинаковые одновременные запросы объединяются.
+    """
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ]
+    key = llm_cache.make_key(settings.llm_model, settings.llm_temperature, max_tokens, messages)
+    requested = False
+
+    async def request() -> str:
+        nonlocal requested
+        requested = True
+        response = await get_openai_client().chat.completions.create(
+            model=settings.llm_model,
+            messages=messages,
+            temperature=settings.llm_temperature,
+            max_tokens=max_tokens
+        )
+
+        content = response.choices[0].message.content.strip()
+
+        # Очистка ответа от markdown форматирования если есть
+        if content.startswith("```json"):
+            content = content[7:]
+        if content.startswith("```"):
+            content = content[3:]
+        if content.endswith("```"):
+            content = content[:-3]
+        content = content.strip()
 
+        # В кэш попадает только валидный JSON
+        json.loads(content)
+        return content
 
-def get_github_repo_info(repo_url: str) -> Optional[str]:
-    """Получить информацию о репозитории GitHub"""
+    started = time.perf_counter()
+    outcome = "error"
     try:
-        # Парсинг URL репозитория
-        # Поддерживаем форматы: https://github.com/owner/repo или github.com/owner/repo
-        repo_url = repo_url.strip()
-        if repo_url.startswith("http://") or repo_url.startswith("https://"):
-            parts = repo_url.replace("http://", "").replace("https://", "").split("/")
-        else:
-            parts = repo_url.split("/")
-        
-        if len(parts) < 3 or parts[0] != "github.com":
-            return None
-        
-        owner = parts[1]
-        repo = parts[2].replace(".git", "").split("#")[0].split("?")[0]
-        
-        # Получение информации через GitHub API
-        api_url = f"https://api.github.com/repos/{owner}/{repo}"
-        
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(api_url)
-            if response.status_code != 200:
-                return None
-            
-            repo_data = response.json()
-            
-            # Формирование описания репозитория
-            description_parts = []
-            
-            if repo_data.get("description"):
-                description_parts.append(f"Описание: {repo_data['description']}")
-            
-            if repo_data.get("name"):
-                description_parts.append(f"\nНазвание репозитория: {repo_data['name']}")
-            
-            # Попытка получить README отдельно
-            readme_url = f"https://api.github.com/repos/{owner}/{repo}/readme"
-            readme_response = client.get(readme_url, headers={"Accept": "application/vnd.github.v3+json"})
-            if readme_response.status_code == 200:
-                readme_data = readme_response.json()
-                if readme_data.get("content"):
-                    import base64
-                    try:
-                        readme_content = base64.b64decode(readme_data["content"]).decode("utf-8")
-                        # Ограничиваем размер README
-                        readme_content = readme_content[:3000]
-                        description_parts.append(f"\nREADME:\n{readme_content}")
-                    except Exception:
-                        pass
-            
-            if repo_data.get("language"):
-                description_parts.append(f"\nОсновной язык: {repo_data['language']}")
-            
-            if repo_data.get("topics"):
-                description_parts.append(f"\nТемы: {', '.join(repo_data['topics'])}")
-            
-            if repo_data.get("homepage"):
-                description_parts.append(f"\nДомашняя страница: {repo_data['homepage']}")
-            
-            return "\n".join(description_parts) if description_parts else None
-            
-    except Exception as e:
-        print(f"Ошибка при получении информации о репозитории: {e}")
-        return None
+        content = await llm_cache.get_or_compute(key, request)
+        outcome = "ok" if requested else "cache"
+    finally:
+        LLM_REQUEST_LATENCY.labels(settings.llm_model, outcome).observe(time.perf_counter() - started)
+    return json.loads(content)
 
 
-def generate_project_with_llm(description: str) -> Dict[str, str]:
+async def generate_project_with_llm(description: str) -> Dict[str, str]:
     """Генерировать проект через LLM на основе описания"""
     if not settings.openai_key:
         raise ValueError("OPENAI_KEY не настроен в .env")
     
-    client = OpenAI(api_key=settings.openai_key)
-    
     prompt = f"""Ты помощник для создания описания проекта в портфолио. На основе следующего описания проекта или репозитория, создай структурированное описание проекта.
 
 Описание проекта:
@@ -110,43 +122,20 @@ def generate_project_with_llm(description: str) -> Dict[str, str]:
 - Верни ТОЛЬКО валидный JSON без дополнительного текста"""
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Ты помощник для создания описаний проектов. Всегда отвечаешь только валидным JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1500
+        return await complete_json(
+            "Ты помощник для создания описаний проектов. Всегда отвечаешь только валидным JSON.",
+            prompt,
+            max_tokens=1500,
         )
-        
-        content = response.choices[0].message.content.strip()
-        
-        # Очистка ответа от markdown форматирования если есть
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-        
-        import json
-        project_data = json.loads(content)
-        
-        return project_data
-        
     except Exception as e:
         raise ValueError(f"Ошибка при генерации проекта через LLM: {str(e)}")
 
 
-def generate_tweak_with_llm(description: str) -> Dict[str, str]:
+async def generate_tweak_with_llm(description: str) -> Dict[str, str]:
     """Генерировать мелкую доработку через LLM на основе описания"""
     if not settings.openai_key:
         raise ValueError("OPENAI_KEY не настроен в .env")
 
-    client = OpenAI(api_key=settings.openai_key)
-
     prompt = f"""Ты помощник для создания описания мелкой доработки в портфолио IT-компании. На основе следующего описания создай структурированное описание доработки.
 
 Описание:
@@ -177,31 +166,10 @@ def generate_tweak_with_llm(description: str) -> Dict[str, str]:
 - Верни ТОЛЬКО валидный JSON без дополнительного текста"""
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Ты помощник для создания описаний мелких доработок. Всегда отвечаешь только валидным JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=800
+        return await complete_json(
+            "Ты помощник для создания описаний мелких доработок. Всегда отвечаешь только валидным JSON.",
+            prompt,
+            max_tokens=800,
         )
-
-        content = response.choices[0].message.content.strip()
-
-        # Очистка ответа от markdown форматирования если есть
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-        content = content.strip()
-
-        import json
-        tweak_data = json.loads(content)
-
-        return tweak_data
-
     except Exception as e:
         raise ValueError(f"Ошибка при генерации доработки через LLM: {str(e)}")
@@ -0,0 +1,153 @@
+"""Постоянный кэш ответов LLM в SQLite с объединением одинаковых запросов"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.config import settings
+
+
+def normalize_prompt(text: str) -> str:
+    """Нормализация текста для ключа кэша: схлопывание пробелов и переводов строк"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class _LeaderCancelled(Exception):
+    """Задача, выполнявшая одинаковый запрос, отменена"""
+
+
+class LLMCache:
+    """Кэш ответов LLM с вытеснением по LRU и ограничением размера.
+
+    Ключ — хэш нормализованных сообщений, модели, температуры и max_tokens.
+    Одновременные запросы с одинаковым ключом объединяются: в API уходит
+    один запрос, остальные ждут его результата.
+    """
+
+    def __init__(self, path: str, max_entries: int, max_bytes: int, enabled: bool = True):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._initialized = False
+
+    @staticmethod
+    def make_key(model: str, temperature: float, max_tokens: int, messages: list[dict]) -> str:
+        """Ключ кэша для запроса к модели"""
+        normalized = [
+            {"role": m["role"], "content": normalize_prompt(m["content"])}
+            for m in messages
+        ]
+        raw = json.dumps(
+            {"model": model, "temperature": temperature, "max_tokens": max_tokens, "messages": normalized},
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _connect(self):
+        """Соединение с файлом кэша: транзакция фиксируется, соединение закрывается"""
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                    "created_at REAL NOT NULL, last_used_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used_at ON llm_cache (last_used_at)")
+                conn.commit()
+                self._initialized = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE llm_cache SET last_used_at = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def _put(self, key: str, response: str):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, size, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), now, now),
+            )
+            # Вытеснение самых давно использованных записей сверх лимитов
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            if count <= self.max_entries and total <= self.max_bytes:
+                return
+            for old_key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used_at").fetchall():
+                if count <= self.max_entries and total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (old_key,))
+                count -= 1
+                total -= size
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """Вернуть ответ из кэша, дождаться такого же запроса в процессе или выполнить compute"""
+        if not self.enabled:
+            return await compute()
+
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                cached = await asyncio.to_thread(self._get, key)
+                if cached is not None:
+                    return cached
+                # Пока читали кэш, такой же запрос мог уже стартовать
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    break
+            try:
+                return await asyncio.shield(inflight)
+            except _LeaderCancelled:
+                # Отменили только задачу, выполнявшую запрос, — повторяем его сами
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await compute()
+            try:
+                await asyncio.to_thread(self._put, key, response)
+            except sqlite3.Error as e:
+                print(f"Не удалось сохранить ответ LLM в кэш: {e}")
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            # Отмена лидера (например, таймаут задачи) не должна отменять ожидающих:
+            # они получат _LeaderCancelled и выполнят запрос сами
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # ошибку получат ожидающие, в лог она не пойдет
+            raise
+        finally:
+            del self._inflight[key]
+
+
+llm_cache = LLMCache(
+    path=settings.llm_cache_path,
+    max_entries=settings.llm_cache_max_entries,
+    max_bytes=settings.llm_cache_max_bytes,
+    enabled=settings.llm_cache_enabled,
+)
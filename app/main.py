@@ -2,14 +2,27 @@
 import os
 
 from fastapi import FastAPI, Request
-from fastapi.responses import RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import RedirectResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.config import settings
-from app.database import init_db
+from app.assets import PrecompressedStaticFiles, build_assets
+from app.compression import CompressionMiddleware, compressed_body_cache
+from app.database import init_db, dispose_engines
+from app.utils import backfill_project_render_data
+from app.tech_index import rebuild_tech_index
+from app.blobs import rebuild_upload_index
 from app.auth import AdminAuthRequired
+from app.jobs import fail_unfinished_jobs, job_queue
+from app.llm import close_openai_client
+from app.github import github_fetcher
+from app.images import shutdown_image_pool
+from app.metrics import MetricsMiddleware, render_metrics
+from app.profiling import ProfilingMiddleware, tracing_active
+from app.templating import precompile_templates
+from app.prerender import prerender_scheduler
+from app.upload_gc import upload_reconciler
 from app.routers.projects import router as projects_router
 from app.routers.admin import router as admin_router
 
@@ -29,7 +42,36 @@ app = FastAPI(
 async def startup_event():
     """Инициализация при старте приложения"""
     os.makedirs(settings.upload_dir, exist_ok=True)
-    init_db()
+    # Ассеты уже собраны при запуске через serve — здесь только заполняется манифест
+    build_assets()
+    if settings.run_migrations_on_startup:
+        init_db()
+        backfill_project_render_data()
+        rebuild_tech_index()
+        rebuild_upload_index()
+        fail_unfinished_jobs()
+        # При запуске через serve статическая версия уже отрендерена в prepare
+        prerender_scheduler.schedule()
+    # Шаблоны компилируются до первого запроса, байткод берется из кэша на диске
+    precompile_templates()
+    await job_queue.start()
+    upload_reconciler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Освобождение ресурсов при остановке приложения"""
+    await job_queue.stop()
+    await prerender_scheduler.stop()
+    await upload_reconciler.stop()
+    await close_openai_client()
+    await github_fetcher.close()
+    shutdown_image_pool()
+    await dispose_engines()
+
+# Профиль запроса по X-Profile и журнал медленных запросов (внутри сессий — нужна сессия админа)
+if tracing_active():
+    app.add_middleware(ProfilingMiddleware)
 
 # Подключение middleware для сессий
 app.add_middleware(
@@ -46,8 +88,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Подключение статических файлов
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Сжатие HTML и JSON ответов (подключается после сессий и CORS, чтобы сжимать их ответы)
+app.add_middleware(
+    CompressionMiddleware,
+    cache=compressed_body_cache,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
+
+# Время запросов по маршрутам для /metrics (внешний слой — учитывается и сжатие)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# Подключение статических файлов (собранные ассеты отдаются сжатыми и с immutable кэшем)
+app.mount("/static", PrecompressedStaticFiles(directory="app/static"), name="static")
 
 # Подключение роутеров
 app.include_router(projects_router)
@@ -66,6 +121,14 @@ async def health_check():
     return {"status": "ok"}
 
 
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request):
+        """Метрики в формате Prometheus"""
+        body, content_type = render_metrics(request.headers.get("accept", ""))
+        return Response(body, media_type=content_type)
+
+
 
 if __name__ == '__main__':
     import uvicorn
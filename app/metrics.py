@@ -0,0 +1,148 @@
+"""Метрики Prometheus: задержки запросов по шаблону маршрута, запросы к БД, рендер шаблонов, внешние API и загрузки.
+
+При запуске через serve воркеры пишут значения в файлы PROMETHEUS_MULTIPROC_DIR,
+и /metrics любого воркера отдает сумму по всем процессам.
+"""
+import os
+import time
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, disable_created_metrics, multiprocess
+from prometheus_client.exposition import choose_encoder
+from sqlalchemy import event
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import settings
+
+
+# Серии *_created не нужны: Prometheus определяет сброс счетчиков сам
+disable_created_metrics()
+
+# Границы корзин для быстрых операций (запросы к БД, рендер шаблонов), секунды
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Для запросов к LLM, которые длятся секунды
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP запроса по шаблону маршрута",
+    ["method", "route", "status"],
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Время выполнения SQL запроса",
+    ["engine", "operation"],
+    buckets=FAST_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors_total",
+    "SQL запросы, завершившиеся ошибкой",
+    ["engine", "operation"],
+)
+TEMPLATE_RENDER_LATENCY = Histogram(
+    "template_render_duration_seconds",
+    "Время рендера шаблона Jinja2",
+    ["template"],
+    buckets=FAST_BUCKETS,
+)
+LLM_REQUEST_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "Время запроса к LLM; outcome: ok, cache (из кэша или общий с одинаковым запросом), error",
+    ["model", "outcome"],
+    buckets=SLOW_BUCKETS,
+)
+GITHUB_REQUEST_LATENCY = Histogram(
+    "github_request_duration_seconds",
+    "Время запроса к GitHub API; outcome: cache, ok, not_modified, stale, rate_limited, error",
+    ["endpoint", "outcome"],
+)
+UPLOAD_BYTES = Counter("upload_bytes", "Принятые файлы, байты", ["kind"])
+UPLOAD_FILES = Counter("upload_files", "Принятые файлы, количество", ["kind"])
+
+# Операции SQL, для которых ведется отдельная метка; остальные попадают в OTHER
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "CREATE", "ALTER", "DROP"}
+
+
+def observe_upload(kind: str, files: int, size: int):
+    """Учесть принятые файлы: kind — image, mockups_zip, mockup или import"""
+    if files:
+        UPLOAD_FILES.labels(kind).inc(files)
+    if size:
+        UPLOAD_BYTES.labels(kind).inc(size)
+
+
+def _sql_operation(statement: str) -> str:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return operation if operation in SQL_OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine, name: str):
+    """Учитывать время и ошибки запросов движка SQLAlchemy (для асинхронного — engine.sync_engine)"""
+    if not settings.metrics_enabled:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        DB_QUERY_LATENCY.labels(name, _sql_operation(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+        DB_QUERY_ERRORS.labels(name, _sql_operation(context.statement or "")).inc()
+
+
+def route_template(scope: Scope, root_path: str) -> str:
+    """Шаблон маршрута после маршрутизации (/admin/projects/{project_id}), а не фактический путь"""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", "unmatched")
+    # Mount (статика) не пишет route в scope, но дописывает свой путь к root_path
+    mount_path = scope.get("root_path", "")[len(root_path):]
+    if mount_path:
+        return f"{mount_path}/{{path}}"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Гистограмма времени запросов по методу, шаблону маршрута и статусу"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_LATENCY.labels(scope["method"], route_template(scope, root_path), str(status)).observe(
+                time.perf_counter() - started
+            )
+
+
+def render_metrics(accept: str = "") -> tuple[bytes, str]:
+    """Тело и Content-Type ответа /metrics по заголовку Accept: сумма по всем воркерам, если задан PROMETHEUS_MULTIPROC_DIR"""
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    encoder, content_type = choose_encoder(accept)
+    return encoder(registry), content_type
@@ -0,0 +1,137 @@
+"""Статическая версия публичного сайта: пререндер главной и /api/projects в директорию с атомарной заменой"""
+import asyncio
+import fcntl
+import gzip
+import json
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+import brotli
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+from app.database import AsyncReadSessionLocal, dispose_engines
+from app.routers.projects import projects_page, render_index
+from app.schemas import ProjectPage
+
+
+# Ссылка на актуальную версию внутри PRERENDER_DIR: ее и отдает nginx или StaticFiles
+CURRENT_LINK = "current"
+RELEASES_DIR = "releases"
+
+
+async def render_site() -> Dict[str, bytes]:
+    """Отрендерить файлы статической версии: путь внутри версии -> содержимое"""
+    async with AsyncReadSessionLocal() as db:
+        html = await render_index(db)
+        page = await projects_page(db, settings.api_page_size)
+    # Тот же JSON, что отдает /api/projects без параметров
+    projects_json = json.dumps(
+        jsonable_encoder(ProjectPage.model_validate(page)),
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    )
+    return {
+        "index.html": html.encode("utf-8"),
+        "api/projects.json": projects_json.encode("utf-8"),
+    }
+
+
+def write_release(output_dir: str, files: Dict[str, bytes]) -> str:
+    """Записать новую версию рядом с текущей, затем атомарно переключить на нее ссылку current.
+
+    Каждый файл сохраняется вместе с .gz и .br копиями (gzip_static / brotli_static
+    в nginx, PrecompressedStaticFiles). Старые версии удаляются, кроме последних
+    PRERENDER_KEEP_RELEASES: nginx может еще дочитывать файлы из предыдущей.
+    """
+    releases_dir = os.path.join(output_dir, RELEASES_DIR)
+    name = f"{time.time_ns():020d}-{os.getpid()}"
+    release = os.path.join(releases_dir, name)
+    for path, content in files.items():
+        target = os.path.join(release, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(content)
+        with open(f"{target}.gz", "wb") as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        with open(f"{target}.br", "wb") as f:
+            f.write(brotli.compress(content, quality=11))
+
+    # rename() поверх ссылки атомарен: читатели видят либо старую, либо новую версию целиком
+    tmp_link = os.path.join(output_dir, f".{CURRENT_LINK}.{os.getpid()}.tmp")
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(os.path.join(RELEASES_DIR, name), tmp_link)
+    os.replace(tmp_link, os.path.join(output_dir, CURRENT_LINK))
+
+    for old in sorted(os.listdir(releases_dir))[:-max(1, settings.prerender_keep_releases)]:
+        shutil.rmtree(os.path.join(releases_dir, old), ignore_errors=True)
+    return release
+
+
+async def prerender_site(output_dir: str) -> str:
+    """Отрендерить сайт и опубликовать новую версию, вернуть путь к ней.
+
+    Рендер и публикация выполняются под файловой блокировкой: при записях из разных
+    воркеров версии публикуются по очереди, и последней оказывается версия, прочитанная
+    из БД позже всех.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, ".lock"), "w") as lock:
+        await asyncio.to_thread(fcntl.flock, lock.fileno(), fcntl.LOCK_EX)
+        try:
+            files = await render_site()
+            return await asyncio.to_thread(write_release, output_dir, files)
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+class PrerenderScheduler:
+    """Обновление статической версии после записей в админке.
+
+    Рендер выполняется в фоне и не задерживает ответ админке; записи, пришедшие
+    во время рендера, объединяются в один следующий проход.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._pending = False
+
+    def schedule(self):
+        """Запланировать пререндер, если задан PRERENDER_DIR"""
+        if not settings.prerender_dir:
+            return
+        self._pending = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._pending:
+            self._pending = False
+            try:
+                await prerender_site(settings.prerender_dir)
+            except Exception as e:
+                print(f"Не удалось обновить статическую версию сайта: {e}")
+
+    async def stop(self):
+        """Дождаться публикации последних изменений при остановке"""
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+
+prerender_scheduler = PrerenderScheduler()
+
+
+def run_prerender(output_dir: str) -> str:
+    """Пререндер из командной строки: отдельный event loop, соединения закрываются после"""
+    async def main() -> str:
+        try:
+            return await prerender_site(output_dir)
+        finally:
+            await dispose_engines()
+
+    return asyncio.run(main())
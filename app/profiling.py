@@ -0,0 +1,305 @@
+"""Профилирование запросов по требованию и журнал медленных запросов.
+
+Оба режима выключены по умолчанию: без PROFILING_ENABLED и SLOW_REQUEST_THRESHOLD
+middleware не подключается, а обработчики событий SQLAlchemy не регистрируются.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth import ADMIN_SESSION_KEY
+from app.config import settings
+from app.metrics import route_template
+
+
+PROFILE_HEADER = "x-profile"
+# Кадры цикла событий и сервера в начале стека не относятся к обработке запроса
+_RUNNER_PATHS = (f"{os.sep}asyncio{os.sep}", f"{os.sep}uvicorn{os.sep}", f"{os.sep}threading.py", f"{os.sep}anyio{os.sep}")
+_PROJECT_ROOT = os.getcwd() + os.sep
+
+# SQL запросы текущего запроса; None — запрос не трассируется
+_current_queries: ContextVar[Optional[list]] = ContextVar("profiling_queries", default=None)
+
+
+def tracing_active() -> bool:
+    """Включен ли хотя бы один из режимов"""
+    return settings.profiling_enabled or settings.slow_request_threshold > 0
+
+
+# ==================== SQL ====================
+
+def trace_engine_queries(engine):
+    """Записывать SQL и время выполнения в трассировку текущего запроса (для асинхронного движка — engine.sync_engine)"""
+    if not tracing_active():
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_queries.get() is not None:
+            conn.info.setdefault("trace_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries = _current_queries.get()
+        if queries is not None:
+            started = conn.info["trace_started"].pop()
+            queries.append({"sql": " ".join(statement.split())[:1000], "ms": round((time.perf_counter() - started) * 1000, 3)})
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if _current_queries.get() is not None and context.connection is not None:
+            started = context.connection.info.get("trace_started")
+            if started:
+                started.pop()
+
+
+# ==================== Сэмплирование стека ====================
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    if filename.startswith(_PROJECT_ROOT):
+        return filename[len(_PROJECT_ROOT):]
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename)
+
+
+def _frame_stack(frame) -> tuple:
+    """Стек кадра от корня к вершине без кадров цикла событий и сервера: ("app/utils.py:project_to_dict", ...)"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_filename, f"{_short_path(code.co_filename)}:{code.co_qualname}"))
+        frame = frame.f_back
+    stack.reverse()
+    start = 0
+    while start < len(stack) and any(part in stack[start][0] for part in _RUNNER_PATHS):
+        start += 1
+    return tuple(name for _, name in stack[start:])
+
+
+class StackSampler:
+    """Сэмплирующий профайлер потока цикла событий.
+
+    Один фоновый поток на процесс просыпается каждые PROFILING_INTERVAL секунд, пока
+    есть трассируемые запросы, снимает стек потока цикла событий и относит его к
+    задаче asyncio, которая выполнялась в этот момент. Так при параллельных запросах
+    каждый получает только свои сэмплы. Код в пуле потоков (run_in_threadpool) не
+    сэмплируется — его время видно по паузам между сэмплами и по SQL.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._tasks: Dict[asyncio.Task, Counter] = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+
+    def register(self, task: asyncio.Task, samples: Counter):
+        with self._lock:
+            if self._thread is None:
+                self._loop = task.get_loop()
+                self._loop_thread_id = threading.get_ident()
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+            self._tasks[task] = samples
+            self._active.set()
+
+    def unregister(self, task: asyncio.Task):
+        with self._lock:
+            self._tasks.pop(task, None)
+            if not self._tasks:
+                self._active.clear()
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(self._loop_thread_id)
+            task = asyncio.current_task(self._loop)
+            with self._lock:
+                samples = self._tasks.get(task)
+            if frame is not None and samples is not None:
+                stack = _frame_stack(frame)
+                if stack:
+                    samples[stack] += 1
+
+
+_sampler: Optional[StackSampler] = None
+
+
+def get_sampler() -> StackSampler:
+    global _sampler
+    if _sampler is None:
+        _sampler = StackSampler(settings.profiling_interval)
+    return _sampler
+
+
+# ==================== Отчеты ====================
+
+def flame_tree(samples: Counter, min_share: float = 0.005) -> dict:
+    """Дерево вызовов для flame graph: {"name", "count", "children": [...]}; узлы меньше min_share от общего скрыты"""
+    root = {"name": "all", "count": 0, "children": {}}
+    for stack, count in samples.items():
+        root["count"] += count
+        node = root
+        for name in stack:
+            node = node["children"].setdefault(name, {"name": name, "count": 0, "children": {}})
+            node["count"] += count
+
+    threshold = root["count"] * min_share
+
+    def finalize(node: dict) -> dict:
+        children = [finalize(child) for child in node["children"].values() if child["count"] >= threshold]
+        children.sort(key=lambda child: child["count"], reverse=True)
+        return {"name": node["name"], "count": node["count"], "children": children}
+
+    return finalize(root)
+
+
+def collapsed_stacks(samples: Counter) -> str:
+    """Стеки в формате collapsed (flamegraph.pl, speedscope): "a;b;c 12" на строку"""
+    return "\n".join(f"{';'.join(stack)} {count}" for stack, count in samples.most_common()) + "\n"
+
+
+def top_stacks(samples: Counter, limit: int = 5, depth: int = 12) -> List[dict]:
+    """Самые частые стеки (верхние depth кадров) — для журнала медленных запросов"""
+    tops = Counter()
+    for stack, count in samples.items():
+        tops[stack[-depth:]] += count
+    return [{"frames": list(stack), "samples": count} for stack, count in tops.most_common(limit)]
+
+
+def write_slow_request(record: dict):
+    """Дописать запись в SLOW_REQUEST_LOG (JSON на строку)"""
+    path = settings.slow_request_log
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+# ==================== Middleware ====================
+
+class ProfilingMiddleware:
+    """Профиль запроса по заголовку X-Profile (только для админа) и журнал запросов дольше порога.
+
+    X-Profile: 1 (или html) — вместо ответа возвращается flame graph запроса с SQL;
+    X-Profile: collapsed — стеки в текстовом формате collapsed. Подключается внутри
+    SessionMiddleware, чтобы видеть сессию админа.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _profile_format(self, scope: Scope) -> Optional[str]:
+        if not settings.profiling_enabled:
+            return None
+        value = None
+        for name, header in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                value = header.decode("latin-1").strip().lower()
+        if not value or value in ("0", "false"):
+            return None
+        if not scope.get("session", {}).get(ADMIN_SESSION_KEY):
+            return None
+        return "collapsed" if value == "collapsed" else "html"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = self._profile_format(scope)
+        if profile is None and settings.slow_request_threshold <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        queries: list = []
+        samples: Counter = Counter()
+        status = 500
+        token = _current_queries.set(queries)
+        task = asyncio.current_task()
+        sampler = get_sampler()
+        sampler.register(task, samples)
+
+        async def send_traced(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            # В режиме профиля ответ приложения заменяется отчетом
+            if profile is None:
+                await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            duration = time.perf_counter() - started
+            sampler.unregister(task)
+            _current_queries.reset(token)
+
+        route = route_template(scope, root_path)
+        if profile is not None:
+            await self._send_report(send, profile, scope, route, status, duration, queries, samples)
+        if 0 < settings.slow_request_threshold <= duration:
+            record = {
+                "time": datetime.utcnow().isoformat(timespec="milliseconds"),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route,
+                "status": status,
+                "duration_ms": round(duration * 1000, 1),
+                "query_count": len(queries),
+                "query_ms": round(sum(q["ms"] for q in queries), 1),
+                "queries": queries,
+                "samples": sum(samples.values()),
+                "top_stacks": top_stacks(samples),
+            }
+            await asyncio.to_thread(write_slow_request, record)
+            print(f"Медленный запрос {scope['method']} {scope['path']}: {record['duration_ms']} мс, SQL {len(queries)}")
+
+    async def _send_report(self, send: Send, profile: str, scope: Scope, route: str, status: int,
+                           duration: float, queries: list, samples: Counter):
+        if profile == "collapsed":
+            body = collapsed_stacks(samples).encode("utf-8")
+            content_type = b"text/plain; charset=utf-8"
+        else:
+            from app.templating import templates
+
+            body = templates.get_template("admin/profile.html").render(
+                method=scope["method"],
+                path=scope["path"],
+                route=route,
+                status=status,
+                duration_ms=duration * 1000,
+                interval_ms=settings.profiling_interval * 1000,
+                queries=queries,
+                query_ms=sum(q["ms"] for q in queries),
+                tree=flame_tree(samples),
+            ).encode("utf-8")
+            content_type = b"text/html; charset=utf-8"
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", content_type),
+                (b"content-length", str(len(body)).encode()),
+                (b"cache-control", b"no-store"),
+                (b"x-profile-status", str(status).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
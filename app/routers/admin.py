@@ -1,16 +1,21 @@
 """Роутер для админ-панели"""
 from fastapi import APIRouter, Request, Form, File, UploadFile, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
 from typing import List, Optional
 import os
 from datetime import datetime
 
-from app.database import Project, Tweak, SessionDep
+from app.cache import page_cache, bump_data_version
+from app.compression import compressed_body_cache
+from app.database import Project, Tweak, AsyncSessionDep, AsyncReadSessionDep
 from app.auth import verify_password, ADMIN_SESSION_KEY, AdminDep
 from app.config import settings
+from app.templating import templates
 from app.utils import (
     project_to_dict,
+    refresh_project_render_data,
     parse_form_results,
     parse_form_tech_stack,
     save_uploaded_images,
@@ -19,10 +24,22 @@ from app.utils import (
     parse_existing_mockups,
     TWEAK_CATEGORIES,
 )
-from app.llm import generate_project_with_llm, generate_tweak_with_llm, get_github_repo_info
+from app.jobs import job_queue, get_job, JobQueueFull
+from app.images import build_image_derivatives
+from app.blobs import remove_project_uploads, sync_projects_uploads
+from app.metrics import observe_upload
+from app.tech_index import sync_project_tech, remove_project_tech, unknown_tech_categories
+from app.prerender import prerender_scheduler
+from app.transfer import export_stream, import_file
+from app.upload_gc import read_report
 
 router = APIRouter(prefix="/admin", tags=["admin"])
-templates = Jinja2Templates(directory="app/templates")
+
+
+def data_changed():
+    """После записи: сбросить кэши страниц во всех воркерах и обновить статическую версию сайта"""
+    bump_data_version()
+    prerender_scheduler.schedule()
 
 
 def ensure_upload_dir():
@@ -61,10 +78,10 @@ async def logout(request: Request):
 
 
 @router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request, db: SessionDep, admin: AdminDep):
+async def dashboard(request: Request, db: AsyncReadSessionDep, admin: AdminDep):
     """Дашборд со списком проектов"""
-    projects = db.query(Project).order_by(Project.created_at.desc()).all()
-    tweaks = db.query(Tweak).order_by(Tweak.created_at.desc()).all()
+    projects = (await db.scalars(select(Project).order_by(Project.created_at.desc()))).all()
+    tweaks = (await db.scalars(select(Tweak).order_by(Tweak.created_at.desc()))).all()
 
     projects_data = [
         {
@@ -87,14 +104,36 @@ async def dashboard(request: Request, db: SessionDep, admin: AdminDep):
     )
 
 
+def job_form_context(job: Optional[dict], error_prefix: str) -> dict:
+    """Контекст формы по состоянию задачи генерации"""
+    if job is None:
+        return {"error": "Задача генерации не найдена"}
+    if job["status"] == "done":
+        return {"generated_data": job["result"], "generated": True}
+    if job["status"] == "error":
+        return {"error": f"{error_prefix}: {job['error']}"}
+    return {"job_progress": job["progress"] or "В очереди"}
+
+
 @router.get("/projects/new", response_class=HTMLResponse)
-async def new_project_form(request: Request, admin: AdminDep):
-    """Форма создания нового проекта"""
-    return templates.TemplateResponse("admin/project_form.html", {
-        "request": request,
-        "project": None,
-        "is_edit": False
-    })
+async def new_project_form(request: Request, admin: AdminDep, job: Optional[str] = None):
+    """Форма создания нового проекта, с job — заполненная результатом генерации"""
+    context = {"request": request, "project": None, "is_edit": False}
+    if job:
+        job_context = job_form_context(await get_job(job), "Ошибка при генерации проекта")
+        context["project"] = job_context.pop("generated_data", None)
+        context.update(job_context)
+    return templates.TemplateResponse("admin/project_form.html", context)
+
+
+async def submit_generation_job(kind: str, payload: dict) -> tuple[Optional[str], Optional[str]]:
+    """Поставить задачу генерации в очередь, вернуть (job_id, ошибка)"""
+    if not settings.openai_key:
+        return None, "OPENAI_KEY не настроен в .env"
+    try:
+        return await job_queue.submit(kind, payload), None
+    except JobQueueFull:
+        return None, "Очередь генерации переполнена, повторите позже"
 
 
 @router.post("/projects/generate", response_class=HTMLResponse)
@@ -103,42 +142,16 @@ async def generate_project_from_text(
     admin: AdminDep,
     description: str = Form(...)
 ):
-    """Генерация проекта через LLM на основе текстового описания"""
-    try:
-        if not settings.openai_key:
-            return templates.TemplateResponse("admin/project_form.html", {
-                "request": request,
-                "project": None,
-                "is_edit": False,
-                "error": "OPENAI_KEY не настроен в .env"
-            })
-        
-        generated_data = generate_project_with_llm(description)
-        
-        # Форматирование результатов для формы
-        results_text = "\n".join(generated_data.get("results", []))
-        
-        return templates.TemplateResponse("admin/project_form.html", {
-            "request": request,
-            "project": {
-                "title": generated_data.get("title", ""),
-                "industry": generated_data.get("industry", ""),
-                "results": generated_data.get("results", []),
-                "timeline": generated_data.get("timeline", ""),
-                "budget": generated_data.get("budget", ""),
-                "benefits": generated_data.get("benefits", ""),
-                "tech_stack": generated_data.get("tech_stack", {})
-            },
-            "is_edit": False,
-            "generated": True
-        })
-    except Exception as e:
+    """Генерация проекта через LLM на основе текстового описания — ставит задачу в очередь"""
+    job_id, error = await submit_generation_job("project", {"description": description})
+    if error:
         return templates.TemplateResponse("admin/project_form.html", {
             "request": request,
             "project": None,
             "is_edit": False,
-            "error": f"Ошибка при генерации проекта: {str(e)}"
+            "error": error
         })
+    return RedirectResponse(url=f"/admin/projects/new?job={job_id}", status_code=status.HTTP_303_SEE_OTHER)
 
 
 @router.post("/projects/generate-from-github", response_class=HTMLResponse)
@@ -147,57 +160,31 @@ async def generate_project_from_github(
     admin: AdminDep,
     github_url: str = Form(...)
 ):
-    """Генерация проекта через LLM на основе GitHub репозитория"""
-    try:
-        if not settings.openai_key:
-            return templates.TemplateResponse("admin/project_form.html", {
-                "request": request,
-                "project": None,
-                "is_edit": False,
-                "error": "OPENAI_KEY не настроен в .env"
-            })
-        
-        # Получение информации о репозитории
-        repo_info = get_github_repo_info(github_url)
-        if not repo_info:
-            return templates.TemplateResponse("admin/project_form.html", {
-                "request": request,
-                "project": None,
-                "is_edit": False,
-                "error": "Не удалось получить информацию о репозитории. Проверьте URL."
-            })
-        
-        # Генерация проекта на основе информации о репозитории
-        generated_data = generate_project_with_llm(repo_info)
-        
-        return templates.TemplateResponse("admin/project_form.html", {
-            "request": request,
-            "project": {
-                "title": generated_data.get("title", ""),
-                "industry": generated_data.get("industry", ""),
-                "results": generated_data.get("results", []),
-                "timeline": generated_data.get("timeline", ""),
-                "budget": generated_data.get("budget", ""),
-                "benefits": generated_data.get("benefits", ""),
-                "tech_stack": generated_data.get("tech_stack", {}),
-                "github_url": github_url,
-            },
-            "is_edit": False,
-            "generated": True
-        })
-    except Exception as e:
+    """Генерация проекта через LLM на основе GitHub репозитория — ставит задачу в очередь"""
+    job_id, error = await submit_generation_job("project_github", {"github_url": github_url})
+    if error:
         return templates.TemplateResponse("admin/project_form.html", {
             "request": request,
             "project": None,
             "is_edit": False,
-            "error": f"Ошибка при генерации проекта: {str(e)}"
+            "error": error
         })
+    return RedirectResponse(url=f"/admin/projects/new?job={job_id}", status_code=status.HTTP_303_SEE_OTHER)
+
+
+@router.get("/jobs/{job_id}")
+async def generation_job_status(job_id: str, admin: AdminDep):
+    """Состояние задачи генерации: статус, этап, результат или ошибка"""
+    job = await get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return job
 
 
 @router.post("/projects")
 async def create_project(
     request: Request,
-    db: SessionDep,
+    db: AsyncSessionDep,
     admin: AdminDep,
     title: str = Form(...),
     industry: str = Form(...),
@@ -217,8 +204,9 @@ async def create_project(
     # Парсинг данных из формы
     results_list = parse_form_results(results)
     tech_stack_dict = parse_form_tech_stack(tech_stack_keys, tech_stack_values)
-    image_paths = save_uploaded_images(images)
-    mockup_paths = save_mockups_zip(mockups_zip)
+    # Макеты первыми: архив, не прошедший проверку, не оставит сохраненных изображений
+    mockup_paths = await run_in_threadpool(save_mockups_zip, mockups_zip)
+    image_paths = await run_in_threadpool(save_uploaded_images, images)
 
     # Создание проекта
     project = Project(
@@ -235,10 +223,16 @@ async def create_project(
         project.set_images_list(image_paths)
     if mockup_paths:
         project.set_mockups_list(mockup_paths)
+    project.set_image_meta_dict(await build_image_derivatives(image_paths + mockup_paths))
 
     db.add(project)
-    db.commit()
-    db.refresh(project)
+    await db.flush()  # id нужен для индекса технологий и ссылок на файлы
+    refresh_project_render_data(project)
+    await sync_project_tech(db, project)
+    await sync_projects_uploads(db, [project])
+    await db.commit()
+    await db.refresh(project)
+    data_changed()
 
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
 
@@ -247,11 +241,11 @@ async def create_project(
 async def edit_project_form(
     request: Request,
     project_id: int,
-    db: SessionDep,
+    db: AsyncReadSessionDep,
     admin: AdminDep
 ):
     """Форма редактирования проекта"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     
     if not project:
         raise HTTPException(status_code=404, detail="Проект не найден")
@@ -269,7 +263,7 @@ async def edit_project_form(
 async def update_project(
     request: Request,
     project_id: int,
-    db: SessionDep,
+    db: AsyncSessionDep,
     admin: AdminDep,
     title: str = Form(...),
     industry: str = Form(...),
@@ -288,30 +282,30 @@ async def update_project(
     """Обновление проекта"""
     ensure_upload_dir()
 
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Проект не найден")
+    # Освобождаем пишущее соединение на время обработки файлов, изменения запишутся отдельной транзакцией
+    await db.commit()
 
     # Парсинг данных из формы
     results_list = parse_form_results(results)
     tech_stack_dict = parse_form_tech_stack(tech_stack_keys, tech_stack_values)
 
-    # Сохранение изображений
-    image_paths = parse_existing_images(existing_images)
-    image_paths.extend(save_uploaded_images(images))
-
     # Сохранение макетов — оставленные + новые из zip
-    old_mockups = set(project.get_mockups_list())
     mockup_paths = parse_existing_mockups(existing_mockups)
-    new_mockups = save_mockups_zip(mockups_zip)
+    new_mockups = await run_in_threadpool(save_mockups_zip, mockups_zip)
     mockup_paths.extend(new_mockups)
 
-    # Удалить файлы макетов, которые убрали из формы
-    kept = set(mockup_paths)
-    for old_path in old_mockups - kept:
-        full_path = os.path.join("app/static", old_path)
-        if os.path.exists(full_path):
-            os.remove(full_path)
+    # Сохранение изображений
+    image_paths = parse_existing_images(existing_images)
+    image_paths.extend(await run_in_threadpool(save_uploaded_images, images))
+
+    # Адаптивные версии — только для новых файлов, для оставленных берутся прежние
+    image_meta = project.get_image_meta_dict()
+    current_paths = image_paths + mockup_paths
+    image_meta = {path: meta for path, meta in image_meta.items() if path in current_paths}
+    image_meta.update(await build_image_derivatives([p for p in current_paths if p not in image_meta]))
 
     # Обновление проекта
     project.title = title
@@ -324,10 +318,16 @@ async def update_project(
     project.set_tech_stack_dict(tech_stack_dict)
     project.set_images_list(image_paths)
     project.set_mockups_list(mockup_paths)
+    project.set_image_meta_dict(image_meta)
     project.updated_at = datetime.utcnow()
-    
-    db.commit()
-    db.refresh(project)
+    refresh_project_render_data(project)
+    await sync_project_tech(db, project)
+    # Файлы, убранные из формы, остаются на диске — их уберет сверка загрузок, если на них больше никто не ссылается
+    await sync_projects_uploads(db, [project])
+
+    await db.commit()
+    await db.refresh(project)
+    data_changed()
     
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
 
@@ -336,44 +336,87 @@ async def update_project(
 async def delete_project(
     request: Request,
     project_id: int,
-    db: SessionDep,
+    db: AsyncSessionDep,
     admin: AdminDep
 ):
     """Удаление проекта"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Проект не найден")
     
-    # Удаление изображений
-    images = project.get_images_list()
-    for image_path in images:
-        full_path = os.path.join("app/static", image_path)
-        if os.path.exists(full_path):
-            os.remove(full_path)
-
-    # Удаление макетов
-    for mockup_path in project.get_mockups_list():
-        full_path = os.path.join("app/static", mockup_path)
-        if os.path.exists(full_path):
-            os.remove(full_path)
-
-    db.delete(project)
-    db.commit()
+    # Файлы проекта удаляет сверка загрузок (app/upload_gc.py), когда на них не останется ссылок
+    await remove_project_tech(db, project.id)
+    await remove_project_uploads(db, project.id)
+    await db.delete(project)
+    await db.commit()
+    data_changed()
 
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
 
 
+@router.get("/cache/stats")
+async def cache_stats(admin: AdminDep):
+    """Статистика кэша публичных страниц и кэша сжатых ответов"""
+    return {**page_cache.stats(), "compression": compressed_body_cache.stats()}
+
+
+@router.get("/uploads/gc")
+async def upload_gc_report(admin: AdminDep):
+    """Отчет последней сверки загрузок: файлы в карантине, удаленные и ссылки на отсутствующие файлы"""
+    return {"interval": settings.upload_gc_interval, "report": await run_in_threadpool(read_report)}
+
+
+@router.get("/tech/unknown-categories")
+async def tech_unknown_categories(admin: AdminDep, db: AsyncReadSessionDep):
+    """Категории технологий из проектов, не найденные в реестре app/tech_categories.py"""
+    return {"items": await unknown_tech_categories(db)}
+
+
+@router.get("/export")
+async def export_portfolio(admin: AdminDep, files: bool = False):
+    """Потоковая выгрузка портфолио: NDJSON, с files=true — tar архив с NDJSON и загруженными файлами"""
+    date = datetime.utcnow().strftime("%Y%m%d")
+    filename, media_type = (
+        (f"portfolio-{date}.tar", "application/x-tar") if files
+        else (f"portfolio-{date}.ndjson", "application/x-ndjson")
+    )
+    return StreamingResponse(
+        export_stream(include_files=files),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/import")
+async def import_portfolio(admin: AdminDep, db: AsyncSessionDep, file: UploadFile = File(...)):
+    """Импорт NDJSON или tar архива из /admin/export одной транзакцией; повторный импорт обновляет записи"""
+    observe_upload("import", 1, file.size or 0)
+    try:
+        stats = await import_file(db, file.file)
+    except ValueError as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+    data_changed()
+    return stats
+
+
 # ==================== Мелкие доработки ====================
 
 @router.get("/tweaks/new", response_class=HTMLResponse)
-async def new_tweak_form(request: Request, admin: AdminDep):
-    """Форма создания новой доработки"""
-    return templates.TemplateResponse("admin/tweak_form.html", {
+async def new_tweak_form(request: Request, admin: AdminDep, job: Optional[str] = None):
+    """Форма создания новой доработки, с job — заполненная результатом генерации"""
+    context = {
         "request": request,
         "tweak": None,
         "is_edit": False,
         "tweak_categories": TWEAK_CATEGORIES,
-    })
+    }
+    if job:
+        job_context = job_form_context(await get_job(job), "Ошибка при генерации")
+        context["tweak"] = job_context.pop("generated_data", None)
+        context.update(job_context)
+    return templates.TemplateResponse("admin/tweak_form.html", context)
 
 
 @router.post("/tweaks/generate", response_class=HTMLResponse)
@@ -382,52 +425,23 @@ async def generate_tweak_from_text(
     admin: AdminDep,
     description: str = Form(...)
 ):
-    """Генерация доработки через LLM на основе текстового описания"""
-    try:
-        if not settings.openai_key:
-            return templates.TemplateResponse("admin/tweak_form.html", {
-                "request": request,
-                "tweak": None,
-                "is_edit": False,
-                "tweak_categories": TWEAK_CATEGORIES,
-                "error": "OPENAI_KEY не настроен в .env",
-            })
-
-        generated_data = generate_tweak_with_llm(description)
-
-        # Создаём объект-заглушку для шаблона
-        class TweakData:
-            pass
-
-        tweak_data = TweakData()
-        tweak_data.title = generated_data.get("title", "")
-        tweak_data.description = generated_data.get("description", "")
-        tweak_data.category = generated_data.get("category", "other")
-        tweak_data.project_name = generated_data.get("project_name")
-        tweak_data.time_spent = generated_data.get("time_spent")
-        tweak_data.github_url = generated_data.get("github_url")
-
-        return templates.TemplateResponse("admin/tweak_form.html", {
-            "request": request,
-            "tweak": tweak_data,
-            "is_edit": False,
-            "tweak_categories": TWEAK_CATEGORIES,
-            "generated": True,
-        })
-    except Exception as e:
+    """Генерация доработки через LLM на основе текстового описания — ставит задачу в очередь"""
+    job_id, error = await submit_generation_job("tweak", {"description": description})
+    if error:
         return templates.TemplateResponse("admin/tweak_form.html", {
             "request": request,
             "tweak": None,
             "is_edit": False,
             "tweak_categories": TWEAK_CATEGORIES,
-            "error": f"Ошибка при генерации: {str(e)}",
+            "error": error,
         })
+    return RedirectResponse(url=f"/admin/tweaks/new?job={job_id}", status_code=status.HTTP_303_SEE_OTHER)
 
 
 @router.post("/tweaks")
 async def create_tweak(
     request: Request,
-    db: SessionDep,
+    db: AsyncSessionDep,
     admin: AdminDep,
     title: str = Form(...),
     description: str = Form(...),
@@ -446,7 +460,8 @@ async def create_tweak(
         github_url=github_url if github_url and github_url.strip() else None,
     )
     db.add(tweak)
-    db.commit()
+    await db.commit()
+    data_changed()
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
 
 
@@ -454,11 +469,11 @@ async def create_tweak(
 async def edit_tweak_form(
     request: Request,
     tweak_id: int,
-    db: SessionDep,
+    db: AsyncReadSessionDep,
     admin: AdminDep,
 ):
     """Форма редактирования доработки"""
-    tweak = db.query(Tweak).filter(Tweak.id == tweak_id).first()
+    tweak = await db.get(Tweak, tweak_id)
     if not tweak:
         raise HTTPException(status_code=404, detail="Доработка не найдена")
 
@@ -474,7 +489,7 @@ async def edit_tweak_form(
 async def update_tweak(
     request: Request,
     tweak_id: int,
-    db: SessionDep,
+    db: AsyncSessionDep,
     admin: AdminDep,
     title: str = Form(...),
     description: str = Form(...),
@@ -484,7 +499,7 @@ async def update_tweak(
     github_url: Optional[str] = Form(default=None),
 ):
     """Обновление доработки"""
-    tweak = db.query(Tweak).filter(Tweak.id == tweak_id).first()
+    tweak = await db.get(Tweak, tweak_id)
     if not tweak:
         raise HTTPException(status_code=404, detail="Доработка не найдена")
 
@@ -494,7 +509,8 @@ async def update_tweak(
     tweak.project_name = project_name if project_name and project_name.strip() else None
     tweak.time_spent = time_spent if time_spent and time_spent.strip() else None
     tweak.github_url = github_url if github_url and github_url.strip() else None
-    db.commit()
+    await db.commit()
+    data_changed()
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
 
 
@@ -502,14 +518,15 @@ async def update_tweak(
 async def delete_tweak(
     request: Request,
     tweak_id: int,
-    db: SessionDep,
+    db: AsyncSessionDep,
     admin: AdminDep,
 ):
     """Удаление доработки"""
-    tweak = db.query(Tweak).filter(Tweak.id == tweak_id).first()
+    tweak = await db.get(Tweak, tweak_id)
     if not tweak:
         raise HTTPException(status_code=404, detail="Доработка не найдена")
 
-    db.delete(tweak)
-    db.commit()
+    await db.delete(tweak)
+    await db.commit()
+    data_changed()
     return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
\ No newline at end of file
@@ -1,40 +1,210 @@
 """Роутер для публичного API проектов"""
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Query, HTTPException
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from typing import List
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Sequence
 
-from app.database import Project, Tweak, SessionDep
-from app.schemas import ProjectResponse
-from app.utils import project_to_dict, get_tech_icon, TWEAK_CATEGORIES
+from app.cache import page_cache
+from app.config import settings
+from app.templating import templates
+from app.database import Project, ProjectTech, TechFacet, Tweak, AsyncReadSessionDep, IS_SQLITE
+from app.schemas import ProjectPage, SearchPage, TechFacets, TweakPage
+from app.search import search, SEARCH_TYPES
+from app.tech_categories import resolve_tech_category
+from app.utils import (
+    project_render_data,
+    decode_render_data,
+    parse_api_fields,
+    decode_api_value,
+    encode_cursor,
+    decode_cursor,
+    TWEAK_CATEGORIES,
+)
 
 router = APIRouter(tags=["projects"])
-templates = Jinja2Templates(directory="app/templates")
 
 
-@router.get("/", response_class=HTMLResponse)
-async def index(request: Request, db: SessionDep):
-    """Главная страница - лендинг с проектами"""
-    projects = db.query(Project).order_by(Project.created_at.desc()).all()
-    tweaks = db.query(Tweak).order_by(Tweak.created_at.desc()).all()
+async def tweaks_page(db: AsyncSession, limit: int, category: Optional[str] = None, cursor: Optional[str] = None):
+    """Страница доработок, новые первыми — курсорная пагинация по (created_at, id); возвращает (доработки, курсор следующей)"""
+    stmt = (
+        select(Tweak)
+        .order_by(Tweak.created_at.desc(), Tweak.id.desc())
+        .limit(limit + 1)
+    )
+    if category:
+        stmt = stmt.where(Tweak.category == category)
+    if cursor:
+        stmt = stmt.where(tuple_(Tweak.created_at, Tweak.id) < tuple_(*decode_cursor(cursor)))
 
-    # Преобразуем проекты для шаблона
-    projects_data = [project_to_dict(project) for project in projects]
+    tweaks = (await db.scalars(stmt)).all()
+    next_cursor = None
+    if len(tweaks) > limit:
+        tweaks = tweaks[:limit]
+        next_cursor = encode_cursor(tweaks[-1].created_at, tweaks[-1].id)
+    return tweaks, next_cursor
 
-    return templates.TemplateResponse(
-        "index.html",
+
+async def render_index(db: AsyncSession) -> str:
+    """HTML главной страницы из текущих данных — для маршрута / и статического экспорта"""
+    # Данные проектов для шаблона подготовлены при записи — читаем только render_data
+    rows = (await db.execute(
+        select(Project.id, Project.render_data).order_by(Project.created_at.desc())
+    )).all()
+    projects_data = [decode_render_data(row.render_data) for row in rows]
+    stale_ids = [row.id for row, data in zip(rows, projects_data) if data is None]
+    if stale_ids:
+        # Проект записан в обход админки (скрипт, старый формат) — собираем данные на лету
+        stale = {p.id: p for p in await db.scalars(select(Project).where(Project.id.in_(stale_ids)))}
+        projects_data = [
+            data if data is not None else project_render_data(stale[row.id])
+            for row, data in zip(rows, projects_data)
+        ]
+    # Доработок в HTML только первая страница, остальные подгружаются через /api/tweaks
+    tweaks, tweaks_next_cursor = await tweaks_page(db, settings.tweaks_page_size)
+    tweak_counts = dict((await db.execute(
+        select(Tweak.category, func.count()).group_by(Tweak.category)
+    )).all())
+
+    # Страница не зависит от запроса, поэтому рендерим ее без request
+    return templates.get_template("index.html").render(
         {
-            "request": request,
             "projects": projects_data,
             "tweaks": tweaks,
+            "tweaks_next_cursor": tweaks_next_cursor,
+            "tweaks_page_size": settings.tweaks_page_size,
+            "tweak_counts": tweak_counts,
             "tweak_categories": TWEAK_CATEGORIES,
-            "get_tech_icon": get_tech_icon,
         }
     )
 
 
-@router.get("/api/projects", response_model=List[ProjectResponse])
-async def get_projects(db: SessionDep):
-    """JSON API для получения всех проектов"""
-    projects = db.query(Project).order_by(Project.created_at.desc()).all()
-    return projects
\ No newline at end of file
+@router.get("/", response_class=HTMLResponse)
+async def index(request: Request, db: AsyncReadSessionDep):
+    """Главная страница - лендинг с проектами"""
+    # Версию запоминаем до чтения из БД, чтобы не закэшировать устаревший рендер
+    version = page_cache.version
+    html = page_cache.get("index")
+    if html is not None:
+        return HTMLResponse(html)
+
+    html = await render_index(db)
+    page_cache.set("index", html, version)
+    return HTMLResponse(html)
+
+
+async def projects_page(
+    db: AsyncSession,
+    limit: int,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    tech: Sequence[str] = (),
+    category: Sequence[str] = (),
+) -> dict:
+    """Страница /api/projects: {"items", "next_cursor"}; ValueError для некорректных fields или курсора"""
+    selected = parse_api_fields(fields)
+    after = decode_cursor(cursor) if cursor else None
+
+    # Ключ пагинации выбираем всегда, даже если его нет в fields
+    names = list(dict.fromkeys([*selected, "created_at", "id"]))
+    stmt = (
+        select(*[getattr(Project, name) for name in names])
+        .order_by(Project.created_at.desc(), Project.id.desc())
+        .limit(limit + 1)
+    )
+    if after:
+        stmt = stmt.where(tuple_(Project.created_at, Project.id) < tuple_(*after))
+    for value in tech:
+        stmt = stmt.where(Project.id.in_(
+            select(ProjectTech.project_id).where(ProjectTech.tag_key == value.strip().lower())
+        ))
+    for value in category:
+        stmt = stmt.where(Project.id.in_(
+            select(ProjectTech.project_id).where(
+                ProjectTech.category_key == (resolve_tech_category(value) or value.strip().lower())
+            )
+        ))
+
+    rows = (await db.execute(stmt)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    items = [
+        {name: decode_api_value(name, row[name]) for name in selected}
+        for row in rows
+    ]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/api/projects", response_model=ProjectPage)
+async def get_projects(
+    db: AsyncReadSessionDep,
+    limit: int = Query(default=settings.api_page_size, ge=1, le=settings.api_max_page_size),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    tech: List[str] = Query(default=[]),
+    category: List[str] = Query(default=[]),
+):
+    """JSON API со списком проектов — курсорная пагинация по (created_at, id).
+
+    tech= и category= (можно повторять) оставляют проекты, где есть все указанные
+    технологии и категории; фильтр выполняется по индексу project_tech. Категория
+    сопоставляется с реестром, поэтому category=База данных находит и Database.
+    """
+    try:
+        return await projects_page(db, limit, cursor=cursor, fields=fields, tech=tech, category=category)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/api/projects/facets", response_model=TechFacets)
+async def get_project_facets(db: AsyncReadSessionDep):
+    """Технологии и категории с количеством проектов для фильтров — счетчики предрассчитаны при записи"""
+    rows = (await db.execute(
+        select(TechFacet.kind, TechFacet.key, TechFacet.name, TechFacet.count)
+        .order_by(TechFacet.kind, TechFacet.count.desc(), TechFacet.key)
+    )).all()
+    facets = {"tags": [], "categories": []}
+    for row in rows:
+        group = "tags" if row.kind == "tag" else "categories"
+        facets[group].append({"key": row.key, "name": row.name, "count": row.count})
+    return facets
+
+
+@router.get("/api/tweaks", response_model=TweakPage)
+async def get_tweaks(
+    db: AsyncReadSessionDep,
+    limit: int = Query(default=settings.tweaks_page_size, ge=1, le=settings.api_max_page_size),
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+):
+    """JSON API ленты доработок — фильтр по категории и курсорная пагинация по (created_at, id)"""
+    try:
+        tweaks, next_cursor = await tweaks_page(db, limit, category=category, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": tweaks, "next_cursor": next_cursor}
+
+
+@router.get("/api/search", response_model=SearchPage)
+async def search_api(
+    db: AsyncReadSessionDep,
+    q: str = Query(..., min_length=1, max_length=200),
+    type: str = Query(default="all"),
+    limit: int = Query(default=settings.api_page_size, ge=1, le=settings.api_max_page_size),
+    offset: int = Query(default=0, ge=0),
+):
+    """Полнотекстовый поиск по проектам и доработкам, отсортированный по релевантности"""
+    if not IS_SQLITE:
+        raise HTTPException(status_code=501, detail="Поиск доступен только для SQLite")
+    if type not in SEARCH_TYPES:
+        raise HTTPException(status_code=400, detail=f"type должен быть одним из: {', '.join(SEARCH_TYPES)}")
+
+    items = await search(db, q, type, limit, offset)
+    next_offset = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_offset = offset + limit
+    return {"items": items, "next_offset": next_offset}
@@ -1,6 +1,6 @@
 """Pydantic схемы для валидации данных"""
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 
@@ -50,6 +50,40 @@ class ProjectResponse(ProjectBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProjectPage(BaseModel):
+    """Страница проектов с курсором на следующую"""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+
+class TechFacet(BaseModel):
+    """Значение фильтра: ключ для tech=/category=, название и количество проектов"""
+    key: str
+    name: str
+    count: int
+
+
+class TechFacets(BaseModel):
+    """Счетчики проектов по технологиям и категориям"""
+    tags: List[TechFacet]
+    categories: List[TechFacet]
+
+
+class SearchHit(BaseModel):
+    """Результат поиска: заголовок и фрагмент с подсветкой <mark>"""
+    type: str
+    id: int
+    title: str
+    snippet: Optional[str] = None
+    rank: float
+
+
+class SearchPage(BaseModel):
+    """Страница результатов поиска со смещением следующей"""
+    items: List[SearchHit]
+    next_offset: Optional[int] = None
+
+
 class TweakBase(BaseModel):
     """Базовая схема мелкой доработки"""
     title: str = Field(..., min_length=1, max_length=200)
@@ -68,6 +102,12 @@ class TweakResponse(TweakBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TweakPage(BaseModel):
+    """Страница доработок с курсором на следующую"""
+    items: List[TweakResponse]
+    next_cursor: Optional[str] = None
+
+
 class LoginRequest(BaseModel):
     """Схема для входа"""
     password: str
\ No newline at end of file
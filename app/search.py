@@ -0,0 +1,148 @@
+"""Полнотекстовый поиск по проектам и доработкам (SQLite FTS5)"""
+import html
+import re
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+# Маркеры подсветки из символов Private Use Area: текст экранируется, затем маркеры заменяются на <mark>
+_MARK_OPEN = "\ue000"
+_MARK_CLOSE = "\ue001"
+
+# Текст для индекса: JSON-колонки разворачиваются в слова (результаты, категории и значения стека)
+_PROJECT_VALUES = """
+    NEW.id, NEW.title, NEW.industry, NEW.benefits,
+    (SELECT group_concat(value, ' ') FROM json_each(CASE WHEN json_valid(NEW.results) THEN NEW.results ELSE '[]' END)),
+    (SELECT group_concat(key || ' ' || value, ' ') FROM json_each(CASE WHEN json_valid(NEW.tech_stack) THEN NEW.tech_stack ELSE '{}' END))
+"""
+_TWEAK_VALUES = "NEW.id, NEW.title, NEW.description, NEW.project_name"
+
+# FTS5 таблицы и триггеры, поддерживающие их в актуальном состоянии при записи
+SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5("
+    "title, industry, benefits, results, tech_stack, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tweaks_fts USING fts5("
+    "title, description, project_name, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    f"""CREATE TRIGGER IF NOT EXISTS projects_fts_insert AFTER INSERT ON projects BEGIN
+        INSERT INTO projects_fts (rowid, title, industry, benefits, results, tech_stack) VALUES ({_PROJECT_VALUES});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS projects_fts_delete AFTER DELETE ON projects BEGIN
+        DELETE FROM projects_fts WHERE rowid = OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS projects_fts_update AFTER UPDATE OF title, industry, benefits, results, tech_stack ON projects BEGIN
+        DELETE FROM projects_fts WHERE rowid = OLD.id;
+        INSERT INTO projects_fts (rowid, title, industry, benefits, results, tech_stack) VALUES ({_PROJECT_VALUES});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tweaks_fts_insert AFTER INSERT ON tweaks BEGIN
+        INSERT INTO tweaks_fts (rowid, title, description, project_name) VALUES ({_TWEAK_VALUES});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tweaks_fts_delete AFTER DELETE ON tweaks BEGIN
+        DELETE FROM tweaks_fts WHERE rowid = OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tweaks_fts_update AFTER UPDATE OF title, description, project_name ON tweaks BEGIN
+        DELETE FROM tweaks_fts WHERE rowid = OLD.id;
+        INSERT INTO tweaks_fts (rowid, title, description, project_name) VALUES ({_TWEAK_VALUES});
+    END""",
+]
+
+# Заполнение индекса для записей, появившихся до создания триггеров: таблица -> (FTS таблица, INSERT)
+SEARCH_REBUILD = {
+    "projects": (
+        "projects_fts",
+        "INSERT INTO projects_fts (rowid, title, industry, benefits, results, tech_stack) "
+        f"SELECT {_PROJECT_VALUES.replace('NEW.', 'projects.')} FROM projects",
+    ),
+    "tweaks": (
+        "tweaks_fts",
+        "INSERT INTO tweaks_fts (rowid, title, description, project_name) "
+        f"SELECT {_TWEAK_VALUES.replace('NEW.', 'tweaks.')} FROM tweaks",
+    ),
+}
+
+# Веса колонок для bm25: совпадение в названии важнее совпадения в описании
+_RANK_SQL = {
+    "projects": "SELECT 'project' AS type, rowid AS id, bm25(projects_fts, 10.0, 4.0, 1.0, 2.0, 3.0) AS rank "
+                "FROM projects_fts WHERE projects_fts MATCH :query",
+    "tweaks": "SELECT 'tweak' AS type, rowid AS id, bm25(tweaks_fts, 10.0, 2.0, 3.0) AS rank "
+              "FROM tweaks_fts WHERE tweaks_fts MATCH :query",
+}
+
+# Подсветка считается только для записей текущей страницы
+_HIGHLIGHT_SQL = {
+    "project": "SELECT rowid AS id, highlight(projects_fts, 0, :mark_open, :mark_close) AS title, "
+               "snippet(projects_fts, -1, :mark_open, :mark_close, '…', 16) AS snippet "
+               "FROM projects_fts WHERE projects_fts MATCH :query AND rowid IN ({ids})",
+    "tweak": "SELECT rowid AS id, highlight(tweaks_fts, 0, :mark_open, :mark_close) AS title, "
+             "snippet(tweaks_fts, -1, :mark_open, :mark_close, '…', 16) AS snippet "
+             "FROM tweaks_fts WHERE tweaks_fts MATCH :query AND rowid IN ({ids})",
+}
+
+SEARCH_TYPES = ("all", "projects", "tweaks")
+
+
+def ensure_search_index(conn):
+    """Создать FTS5 таблицы и триггеры; пересобрать индекс, если он расходится с таблицей"""
+    for statement in SEARCH_DDL:
+        conn.execute(text(statement))
+    for table, (fts_table, insert_sql) in SEARCH_REBUILD.items():
+        rows = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+        indexed = conn.execute(text(f"SELECT COUNT(*) FROM {fts_table}")).scalar()
+        if rows != indexed:
+            conn.execute(text(f"DELETE FROM {fts_table}"))
+            conn.execute(text(insert_sql))
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Пользовательский запрос -> выражение FTS5: все слова обязательны, последнее — по префиксу"""
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def render_highlight(value: Optional[str]) -> Optional[str]:
+    """Экранировать HTML и заменить маркеры подсветки на <mark>"""
+    if value is None:
+        return None
+    return html.escape(value).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+async def search(db: AsyncSession, query: str, kind: str, limit: int, offset: int) -> List[dict]:
+    """Ранжированный поиск: на одну запись больше limit, чтобы понять, есть ли следующая страница.
+
+    Сначала по bm25 выбирается страница (type, id), затем для нее одной строятся
+    подсвеченные заголовки и фрагменты — snippet() дорог, и считать его для всех
+    совпадений незачем.
+    """
+    match = build_match_query(query)
+    if match is None:
+        return []
+    parts = [_RANK_SQL[name] for name in ("projects", "tweaks") if kind in ("all", name)]
+    sql = " UNION ALL ".join(parts) + " ORDER BY rank, type, id LIMIT :limit OFFSET :offset"
+    page = (await db.execute(text(sql), {"query": match, "limit": limit + 1, "offset": offset})).all()
+
+    highlights = {}
+    for hit_type, template in _HIGHLIGHT_SQL.items():
+        ids = [row.id for row in page if row.type == hit_type]
+        if not ids:
+            continue
+        stmt = text(template.format(ids=", ".join(str(int(i)) for i in ids)))
+        params = {"query": match, "mark_open": _MARK_OPEN, "mark_close": _MARK_CLOSE}
+        for row in await db.execute(stmt, params):
+            highlights[(hit_type, row.id)] = (row.title, row.snippet)
+
+    items = []
+    for row in page:
+        title, snippet = highlights.get((row.type, row.id), ("", None))
+        items.append({
+            "type": row.type,
+            "id": row.id,
+            "title": render_highlight(title),
+            "snippet": render_highlight(snippet),
+            "rank": round(row.rank, 4),
+        })
+    return items
@@ -107,32 +107,104 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
-    // ==================== Фильтр доработок ====================
+    // ==================== Лента доработок ====================
+    // Первая страница отрендерена сервером, фильтр и следующие страницы запрашиваются у /api/tweaks
+    var tweaksGrid = document.querySelector('.tweaks-grid');
+    var tweaksMoreBtn = document.querySelector('.tweaks-more-btn');
+    var tweakTemplate = document.getElementById('tweakCardTemplate');
+    var tweakCategoriesEl = document.getElementById('tweakCategories');
+    var tweakCategories = tweakCategoriesEl ? JSON.parse(tweakCategoriesEl.textContent) : {};
     const filters = document.querySelectorAll('.tweak-filter');
-    const tweakCards = document.querySelectorAll('.tweak-card');
+    var tweaksCategory = 'all';
+    var tweaksCursor = tweaksGrid ? tweaksGrid.getAttribute('data-next-cursor') : '';
+    var tweaksRequest = 0;
+
+    function renderTweakCard(tweak) {
+        var card = tweakTemplate.content.firstElementChild.cloneNode(true);
+        card.setAttribute('data-category', tweak.category);
+
+        var category = card.querySelector('.tweak-category');
+        category.textContent = tweakCategories[tweak.category] || tweak.category;
+        category.classList.add('tweak-category--' + tweak.category);
+        card.querySelector('.tweak-title').textContent = tweak.title;
+        card.querySelector('.tweak-description').textContent = tweak.description;
+
+        var time = card.querySelector('.tweak-time');
+        if (tweak.time_spent) { time.textContent = tweak.time_spent; } else { time.remove(); }
+        var project = card.querySelector('.tweak-project');
+        if (tweak.project_name) { project.textContent = tweak.project_name; } else { project.remove(); }
+        // created_at приходит в UTC без смещения: new Date() прочитал бы его как местное время,
+        // поэтому дата берется из строки — так же, как ее выводит шаблон (%d.%m.%Y)
+        var date = String(tweak.created_at).slice(0, 10).split('-');
+        card.querySelector('.tweak-date').textContent = [date[2], date[1], date[0]].join('.');
+
+        if (tweak.github_url) {
+            card.setAttribute('data-github-url', tweak.github_url);
+            card.querySelector('.tweak-back-github-link').href = tweak.github_url;
+            card.querySelector('.tweak-back-no-link').remove();
+        } else {
+            card.querySelector('.tweak-back-github-link').remove();
+        }
+        return card;
+    }
+
+    function loadTweaks(reset) {
+        var params = new URLSearchParams({ limit: tweaksGrid.getAttribute('data-page-size') });
+        if (tweaksCategory !== 'all') params.set('category', tweaksCategory);
+        if (!reset && tweaksCursor) params.set('cursor', tweaksCursor);
+
+        // Ответ на устаревший запрос (фильтр успели сменить) игнорируется
+        var request = ++tweaksRequest;
+        tweaksMoreBtn.disabled = true;
+        fetch('/api/tweaks?' + params.toString())
+            .then(function(response) {
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                return response.json();
+            })
+            .then(function(page) {
+                if (request !== tweaksRequest) return;
+                if (reset) tweaksGrid.innerHTML = '';
+                page.items.forEach(function(tweak) {
+                    tweaksGrid.appendChild(renderTweakCard(tweak));
+                });
+                tweaksCursor = page.next_cursor || '';
+                tweaksMoreBtn.hidden = !tweaksCursor;
+            })
+            .catch(function(error) {
+                console.error('Не удалось загрузить доработки:', error);
+            })
+            .finally(function() {
+                if (request === tweaksRequest) tweaksMoreBtn.disabled = false;
+            });
+    }
 
     filters.forEach(function(filter) {
         filter.addEventListener('click', function() {
             var category = this.getAttribute('data-category');
+            if (category === tweaksCategory) return;
 
             // Убираем active у всех фильтров
             filters.forEach(function(f) { f.classList.remove('active'); });
             this.classList.add('active');
 
-            // Показываем/скрываем карточки
-            tweakCards.forEach(function(card) {
-                if (category === 'all' || card.getAttribute('data-category') === category) {
-                    card.style.display = '';
-                } else {
-                    card.style.display = 'none';
-                }
-            });
+            tweaksCategory = category;
+            loadTweaks(true);
         });
     });
 
+    if (tweaksMoreBtn) {
+        tweaksMoreBtn.addEventListener('click', function() {
+            loadTweaks(false);
+        });
+    }
+
     // ==================== Анимация переворота карточек доработок ====================
-    tweakCards.forEach(function(card) {
-        card.addEventListener('click', function() {
+    // Делегирование на сетку: обработчик работает и для подгруженных карточек
+    if (tweaksGrid) {
+        tweaksGrid.addEventListener('click', function(event) {
+            var card = event.target.closest('.tweak-card');
+            if (!card) return;
+
             if (card.classList.contains('flipping') || card.classList.contains('flipping-back')) return;
 
             var isFlipped = card.classList.contains('flipped');
@@ -162,7 +234,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 });
             }
         });
-    });
+    }
 
     function createCrackParticles(card) {
         var rect = card.getBoundingClientRect();
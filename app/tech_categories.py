@@ -0,0 +1,90 @@
+"""Реестр категорий технологий: канонические категории, синонимы и иконки"""
+import re
+from functools import lru_cache
+from typing import Optional
+
+
+# Каноническая категория -> название, иконка и синонимы (русские и английские, в нижнем регистре)
+TECH_CATEGORIES = {
+    "frontend": {
+        "name": "Frontend",
+        "icon": "icons/frontend.svg",
+        "aliases": ["frontend", "front-end", "front end", "фронтенд", "фронт", "web", "веб"],
+    },
+    "backend": {
+        "name": "Backend",
+        "icon": "icons/backend.svg",
+        "aliases": ["backend", "back-end", "back end", "бэкенд", "бекенд", "сервер", "server"],
+    },
+    "database": {
+        "name": "Database",
+        "icon": "icons/database.svg",
+        "aliases": ["database", "databases", "db", "база данных", "базы данных", "бд", "storage", "хранилище"],
+    },
+    "mobile": {
+        "name": "Mobile",
+        "icon": "icons/mobile.svg",
+        "aliases": ["mobile", "мобильный", "мобильная разработка", "мобильное приложение", "ios", "android"],
+    },
+    "devops": {
+        "name": "DevOps",
+        "icon": "icons/devops.svg",
+        "aliases": ["devops", "dev ops", "ci/cd", "ci", "infrastructure", "инфраструктура", "деплой"],
+    },
+    "design": {
+        "name": "Design",
+        "icon": "icons/design.svg",
+        "aliases": ["design", "дизайн", "ui/ux", "ux/ui", "ux", "ui"],
+    },
+    "testing": {
+        "name": "Testing",
+        "icon": "icons/testing.svg",
+        "aliases": ["testing", "tests", "qa", "тестирование", "тесты"],
+    },
+    "cloud": {
+        "name": "Cloud",
+        "icon": "icons/cloud.svg",
+        "aliases": ["cloud", "облако", "облачные сервисы", "hosting", "хостинг"],
+    },
+    "api": {
+        "name": "API",
+        "icon": "icons/api.svg",
+        "aliases": ["api", "интеграции", "integrations", "интеграция"],
+    },
+}
+
+
+def _compile_matcher() -> tuple[re.Pattern, dict[str, str]]:
+    """Все синонимы в одном регулярном выражении: длинные раньше коротких, совпадение — целыми словами"""
+    alias_to_key = {}
+    for key, category in TECH_CATEGORIES.items():
+        for alias in [key, *category["aliases"]]:
+            alias_to_key.setdefault(alias.lower(), key)
+    aliases = sorted(alias_to_key, key=len, reverse=True)
+    pattern = re.compile(r"(?<!\w)(" + "|".join(re.escape(alias) for alias in aliases) + r")(?!\w)")
+    return pattern, alias_to_key
+
+
+_MATCHER, _ALIAS_TO_KEY = _compile_matcher()
+
+
+@lru_cache(maxsize=4096)
+def resolve_tech_category(name: str) -> Optional[str]:
+    """Каноническая категория для названия из tech_stack или None, если категория неизвестна.
+
+    Точное совпадение с синонимом проверяется словарем, иначе ищется первый синоним
+    внутри названия ("Frontend: Next.js" -> frontend).
+    """
+    normalized = " ".join(name.lower().split())
+    key = _ALIAS_TO_KEY.get(normalized)
+    if key is not None:
+        return key
+    match = _MATCHER.search(normalized)
+    return _ALIAS_TO_KEY[match.group(1)] if match else None
+
+
+def tech_category_icon(key: Optional[str]) -> Optional[str]:
+    """Путь к иконке канонической категории"""
+    if key is None:
+        return None
+    return TECH_CATEGORIES[key]["icon"]
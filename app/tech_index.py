@@ -0,0 +1,214 @@
+"""Нормализованный индекс технологий проектов и предрассчитанные счетчики для фильтров"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, delete, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import IS_SQLITE, Project, ProjectTech, SessionLocal, TechFacet
+from app.tech_categories import TECH_CATEGORIES, resolve_tech_category
+from app.utils import split_tech_tags
+
+# INSERT ... ON CONFLICT DO UPDATE есть только в диалектах SQLite и PostgreSQL
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert as upsert_insert
+else:
+    from sqlalchemy.dialects.postgresql import insert as upsert_insert
+
+# kind счетчика -> (колонка ключа, колонка названия) в project_tech
+FACET_COLUMNS = {
+    "tag": ("tag_key", "tag"),
+    "category": ("category_key", "category"),
+}
+
+
+def project_tech_rows(project: Project) -> List[dict]:
+    """Строки project_tech для проекта: по одной на каждую технологию в каждой категории.
+
+    Ключ категории — каноническая категория из реестра ("База данных" и "Database"
+    попадают в database), для неизвестных категорий — название в нижнем регистре.
+    """
+    try:
+        tech_stack = project.get_tech_stack_dict()
+    except Exception:
+        tech_stack = {}
+    return tech_stack_rows(project.id, tech_stack)
+
+
+def tech_stack_rows(project_id: Optional[int], tech_stack: dict) -> List[dict]:
+    """Строки project_tech по разобранному tech_stack (импорт проставляет project_id после записи)"""
+    rows = {}
+    for category, value in tech_stack.items():
+        category = str(category).strip()
+        if not category:
+            continue
+        category_key = resolve_tech_category(category) or category.lower()
+        for tag in split_tech_tags(value):
+            key = (category_key, tag.lower())
+            rows.setdefault(key, {
+                "project_id": project_id,
+                "category_key": key[0],
+                "tag_key": key[1],
+                "category": category,
+                "tag": tag,
+            })
+    return list(rows.values())
+
+
+def _facet_statements() -> list:
+    """Пересчет tech_facets из project_tech: количество различных проектов на технологию и категорию"""
+    projects_count = func.count(func.distinct(ProjectTech.project_id))
+    tags = select(
+        literal("tag"), ProjectTech.tag_key, func.min(ProjectTech.tag), projects_count
+    ).group_by(ProjectTech.tag_key)
+    categories = select(
+        literal("category"), ProjectTech.category_key, func.min(ProjectTech.category), projects_count
+    ).group_by(ProjectTech.category_key)
+    columns = ["kind", "key", "name", "count"]
+    return [
+        delete(TechFacet),
+        insert(TechFacet).from_select(columns, tags),
+        insert(TechFacet).from_select(columns, categories),
+    ]
+
+
+async def sync_projects_tech(db: AsyncSession, projects: Iterable[Project], refresh_facets: bool = True):
+    """Заменить технологии проектов одним DELETE и одним INSERT; счетчики пересчитываются один раз"""
+    projects = list(projects)
+    rows = [row for project in projects for row in project_tech_rows(project)]
+    await replace_projects_tech(db, [p.id for p in projects], rows)
+    if refresh_facets:
+        await refresh_tech_facets(db)
+    return rows
+
+
+async def replace_projects_tech(db: AsyncSession, project_ids: List[int], rows: List[dict]):
+    """Заменить строки project_tech проектов готовыми строками (счетчики не пересчитываются)"""
+    await db.execute(delete(ProjectTech).where(ProjectTech.project_id.in_(project_ids)))
+    if rows:
+        await db.execute(insert(ProjectTech.__table__), rows)
+
+
+async def refresh_tech_facets(db: AsyncSession):
+    """Пересчитать tech_facets по текущему содержимому project_tech"""
+    for statement in _facet_statements():
+        await db.execute(statement)
+
+
+def _facet_names(rows: Iterable[dict], kind: str) -> Dict[str, str]:
+    """Ключи счетчиков одного проекта с названием (как min(...) в пересчете)"""
+    key_column, name_column = FACET_COLUMNS[kind]
+    names = {}
+    for row in rows:
+        key, name = row[key_column], row[name_column]
+        if key not in names or name < names[key]:
+            names[key] = name
+    return names
+
+
+async def _project_tech(db: AsyncSession, project_id: int) -> List[dict]:
+    """Текущие строки project_tech проекта"""
+    result = await db.execute(
+        select(ProjectTech.category_key, ProjectTech.tag_key, ProjectTech.category, ProjectTech.tag)
+        .where(ProjectTech.project_id == project_id)
+    )
+    return [dict(row._mapping) for row in result]
+
+
+async def _apply_facet_deltas(db: AsyncSession, old_rows: List[dict], new_rows: List[dict]):
+    """Поправить tech_facets на разницу старых и новых технологий одного проекта.
+
+    Вызывается после замены строк project_tech. Ушедшие ключи получают -1 (нулевые
+    счетчики удаляются), новые — +1 через upsert. Название пересчитывается только для
+    ключей, где у проекта сменилось написание или ушло то, что было названием счетчика.
+    """
+    for kind, (key_column, name_column) in FACET_COLUMNS.items():
+        old, new = _facet_names(old_rows, kind), _facet_names(new_rows, kind)
+        removed = sorted(old.keys() - new.keys())
+        added = sorted(new.keys() - old.keys())
+        renamed = sorted(key for key in old.keys() & new.keys() if old[key] != new[key])
+        facets = TechFacet.kind == kind
+
+        if removed:
+            await db.execute(
+                update(TechFacet)
+                .where(facets, TechFacet.key.in_(removed))
+                .values(count=TechFacet.count - 1)
+            )
+            await db.execute(delete(TechFacet).where(facets, TechFacet.key.in_(removed), TechFacet.count <= 0))
+        if added:
+            statement = upsert_insert(TechFacet.__table__)
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[TechFacet.kind, TechFacet.key],
+                    set_={
+                        "count": TechFacet.count + 1,
+                        "name": case(
+                            (statement.excluded.name < TechFacet.name, statement.excluded.name),
+                            else_=TechFacet.name,
+                        ),
+                    },
+                ),
+                [{"kind": kind, "key": key, "name": new[key], "count": 1} for key in added],
+            )
+
+        stale = []
+        if removed:
+            stale.append(tuple_(TechFacet.key, TechFacet.name).in_([(key, old[key]) for key in removed]))
+        if renamed:
+            stale.append(TechFacet.key.in_(renamed))
+        if stale:
+            key_field = getattr(ProjectTech, key_column)
+            name = (
+                select(func.min(getattr(ProjectTech, name_column)))
+                .where(key_field == TechFacet.key)
+                .scalar_subquery()
+            )
+            await db.execute(update(TechFacet).where(facets, or_(*stale)).values(name=name))
+
+
+async def sync_project_tech(db: AsyncSession, project: Project):
+    """Обновить технологии проекта и поправить счетчики на разницу — в транзакции записи проекта, до commit"""
+    old_rows = await _project_tech(db, project.id)
+    rows = await sync_projects_tech(db, [project], refresh_facets=False)
+    await _apply_facet_deltas(db, old_rows, rows)
+    unknown = sorted({row["category"] for row in rows if row["category_key"] not in TECH_CATEGORIES})
+    if unknown:
+        print(f"Проект {project.id}: категории технологий не найдены в реестре: {', '.join(unknown)}")
+
+
+async def remove_project_tech(db: AsyncSession, project_id: int):
+    """Удалить технологии проекта и уменьшить их счетчики"""
+    old_rows = await _project_tech(db, project_id)
+    await db.execute(delete(ProjectTech).where(ProjectTech.project_id == project_id))
+    await _apply_facet_deltas(db, old_rows, [])
+
+
+async def unknown_tech_categories(db: AsyncSession) -> List[dict]:
+    """Категории из стеков проектов, которых нет в реестре, с количеством проектов — кандидаты в синонимы"""
+    rows = await db.execute(
+        select(
+            ProjectTech.category_key,
+            func.min(ProjectTech.category).label("name"),
+            func.count(func.distinct(ProjectTech.project_id)).label("count"),
+        )
+        .where(ProjectTech.category_key.not_in(list(TECH_CATEGORIES)))
+        .group_by(ProjectTech.category_key)
+        .order_by(func.count(func.distinct(ProjectTech.project_id)).desc(), ProjectTech.category_key)
+    )
+    return [{"key": row.category_key, "name": row.name, "count": row.count} for row in rows]
+
+
+def rebuild_tech_index() -> int:
+    """Пересобрать индекс технологий по всем проектам (при старте и после скриптов), вернуть число строк"""
+    db = SessionLocal()
+    try:
+        db.execute(delete(ProjectTech))
+        rows = [row for project in db.scalars(select(Project)) for row in project_tech_rows(project)]
+        if rows:
+            db.execute(insert(ProjectTech), rows)
+        for statement in _facet_statements():
+            db.execute(statement)
+        db.commit()
+        return len(rows)
+    finally:
+        db.close()
@@ -0,0 +1,54 @@
+"""Общее окружение Jinja2 для всех роутеров: кэш байткода и предкомпиляция шаблонов"""
+import os
+import time
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+from app.assets import asset_url
+from app.config import settings
+from app.metrics import TEMPLATE_RENDER_LATENCY
+
+
+TEMPLATES_DIR = "app/templates"
+
+
+class TimedTemplate(jinja2.Template):
+    """Шаблон, учитывающий время рендера в метрике template_render_duration_seconds"""
+
+    def render(self, *args, **kwargs) -> str:
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            TEMPLATE_RENDER_LATENCY.labels(self.name or "<string>").observe(time.perf_counter() - started)
+
+
+def create_environment() -> jinja2.Environment:
+    """Окружение шаблонов: байткод сохраняется на диск, проверка mtime только в режиме разработки"""
+    os.makedirs(settings.template_cache_dir, exist_ok=True)
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        auto_reload=settings.templates_auto_reload,
+        bytecode_cache=jinja2.FileSystemBytecodeCache(settings.template_cache_dir),
+    )
+    if settings.metrics_enabled:
+        env.template_class = TimedTemplate
+    env.globals["asset_url"] = asset_url
+    return env
+
+
+templates = Jinja2Templates(env=create_environment())
+
+
+def precompile_templates() -> int:
+    """Скомпилировать все шаблоны заранее, чтобы первый запрос к воркеру не ждал компиляции; вернуть их количество.
+
+    Скомпилированные шаблоны остаются в памяти окружения, байткод — в TEMPLATE_CACHE_DIR,
+    поэтому следующие воркеры и перезапуски загружают его без разбора исходников.
+    """
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
@@ -0,0 +1,407 @@
+"""Перенос портфолио между окружениями: потоковый экспорт в NDJSON и пакетный импорт с upsert"""
+import asyncio
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, Optional
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.blobs import replace_projects_uploads, upload_paths
+from app.config import settings
+from app.database import IS_SQLITE, AsyncReadSessionLocal, AsyncSessionLocal, Project, Tweak, dispose_engines
+from app.tech_index import refresh_tech_facets, replace_projects_tech, tech_stack_rows
+from app.utils import render_data_from_fields
+
+# INSERT ... ON CONFLICT DO UPDATE есть только в диалектах SQLite и PostgreSQL
+if IS_SQLITE:
+    from sqlalchemy.dialects.sqlite import insert as upsert_insert
+else:
+    from sqlalchemy.dialects.postgresql import insert as upsert_insert
+
+
+EXPORT_FORMAT = "alteran-portfolio"
+EXPORT_VERSION = 1
+
+# Содержимое tar архива: NDJSON и загруженные файлы с путями относительно UPLOAD_DIR
+ARCHIVE_NDJSON = "portfolio.ndjson"
+ARCHIVE_UPLOADS = "uploads/"
+
+# Колонки записей NDJSON; JSON-колонки проекта выгружаются значениями, а не строками
+PROJECT_COLUMNS = ["title", "industry", "timeline", "budget", "benefits", "github_url", "created_at", "updated_at"]
+PROJECT_JSON_COLUMNS = ["results", "tech_stack", "images", "mockups", "image_meta"]
+TWEAK_COLUMNS = ["title", "description", "category", "project_name", "time_spent", "github_url", "created_at"]
+REQUIRED_COLUMNS = {
+    "project": ["title", "industry", "timeline", "budget", "benefits"],
+    "tweak": ["title", "description", "category"],
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Не сериализуется в JSON: {type(value).__name__}")
+
+
+def _dump(record: dict) -> bytes:
+    return json.dumps(record, ensure_ascii=False, default=_json_default).encode("utf-8") + b"\n"
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    """ISO дата из NDJSON (или datetime) -> naive UTC, как хранит приложение"""
+    if value is None:
+        return None
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+# ==================== Экспорт ====================
+
+async def export_lines(db: AsyncSession) -> AsyncIterator[bytes]:
+    """NDJSON портфолио: строка meta, затем проекты и доработки; из БД читается порциями"""
+    yield _dump({
+        "type": "meta",
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "exported_at": datetime.utcnow(),
+    })
+
+    project_columns = [getattr(Project, name) for name in PROJECT_COLUMNS + PROJECT_JSON_COLUMNS]
+    result = await db.stream(
+        select(*project_columns).order_by(Project.id).execution_options(yield_per=settings.transfer_batch_size)
+    )
+    async for rows in result.mappings().partitions():
+        chunk = []
+        for row in rows:
+            record = {"type": "project", **{name: row[name] for name in PROJECT_COLUMNS}}
+            for name in PROJECT_JSON_COLUMNS:
+                record[name] = json.loads(row[name]) if row[name] else None
+            chunk.append(_dump(record))
+        yield b"".join(chunk)
+
+    result = await db.stream(
+        select(*[getattr(Tweak, name) for name in TWEAK_COLUMNS])
+        .order_by(Tweak.id)
+        .execution_options(yield_per=settings.transfer_batch_size)
+    )
+    async for rows in result.mappings().partitions():
+        yield b"".join(_dump({"type": "tweak", **row}) for row in rows)
+
+
+def upload_files() -> Iterator[tuple[str, str]]:
+    """Загруженные файлы: (путь на диске, имя в архиве)"""
+    for root, _, files in os.walk(settings.upload_dir):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield path, ARCHIVE_UPLOADS + os.path.relpath(path, settings.upload_dir).replace(os.sep, "/")
+
+
+class _ChunkBuffer:
+    """Файлоподобный приемник для потоковой записи tar: накопленное забирается через drain()"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def export_stream(include_files: bool = False) -> AsyncIterator[bytes]:
+    """Экспорт для StreamingResponse и CLI: NDJSON или, с include_files, tar с NDJSON и загрузками"""
+    if not include_files:
+        async with AsyncReadSessionLocal() as db:
+            async for chunk in export_lines(db):
+                yield chunk
+        return
+
+    # Размер члена tar нужен заранее, поэтому NDJSON сначала пишется во временный файл
+    with tempfile.TemporaryFile() as ndjson:
+        async with AsyncReadSessionLocal() as db:
+            async for chunk in export_lines(db):
+                ndjson.write(chunk)
+        info = tarfile.TarInfo(ARCHIVE_NDJSON)
+        info.size = ndjson.tell()
+        info.mtime = int(time.time())
+        ndjson.seek(0)
+
+        buffer = _ChunkBuffer()
+        archive = tarfile.open(fileobj=buffer, mode="w|")
+        await asyncio.to_thread(archive.addfile, info, ndjson)
+        yield buffer.drain()
+        for path, arcname in upload_files():
+            await asyncio.to_thread(archive.add, path, arcname)
+            yield buffer.drain()
+        archive.close()
+        yield buffer.drain()
+
+
+# ==================== Импорт ====================
+
+def normalize_record(record: dict) -> dict:
+    """Проверить запись проекта или доработки и привести даты к datetime; ValueError для некорректной"""
+    kind = record.get("type")
+    if kind not in REQUIRED_COLUMNS:
+        raise ValueError(f"неизвестный тип записи {kind!r}")
+    missing = [name for name in REQUIRED_COLUMNS[kind] if not record.get(name)]
+    if missing:
+        raise ValueError(f"не заполнены поля {', '.join(missing)}")
+    try:
+        record["created_at"] = _parse_datetime(record.get("created_at")) or datetime.utcnow()
+        if kind == "project":
+            record["updated_at"] = _parse_datetime(record.get("updated_at")) or record["created_at"]
+    except (TypeError, ValueError):
+        raise ValueError("некорректная дата")
+    return record
+
+
+def parse_lines(lines: Iterable[bytes]) -> Iterator[dict]:
+    """Записи NDJSON с проверкой формата; ValueError с номером строки для некорректных"""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"некорректный JSON ({e.msg})")
+            if not isinstance(record, dict):
+                raise ValueError("ожидается JSON объект")
+            if record.get("type") == "meta":
+                if record.get("format") != EXPORT_FORMAT or record.get("version", 0) > EXPORT_VERSION:
+                    raise ValueError(f"неподдерживаемый формат {record.get('format')} версии {record.get('version')}")
+                continue
+            yield normalize_record(record)
+        except ValueError as e:
+            raise ValueError(f"Строка {number}: {e}")
+
+
+def _json_column(value, keep_empty: bool = False) -> Optional[str]:
+    """JSON-колонка так же, как ее сериализуют сеттеры модели Project"""
+    if not value and not keep_empty:
+        return None
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _prepare_projects(records: list[dict]) -> dict:
+    """Пакет проектов без обращения к БД: {(title, created_at): (строка с render_data, строки project_tech, пути загрузок)}.
+
+    Выполняется в пуле потоков; id проставляются в строки технологий и загрузок после записи.
+    При повторе ключа внутри пакета побеждает последняя запись.
+    """
+    prepared = {}
+    for record in records:
+        row = {name: record.get(name) for name in PROJECT_COLUMNS}
+        row["results"] = _json_column(record.get("results") or [], keep_empty=True)
+        row["tech_stack"] = _json_column(record.get("tech_stack") or {}, keep_empty=True)
+        for name in ("images", "mockups", "image_meta"):
+            row[name] = _json_column(record.get(name))
+        row["render_data"] = json.dumps(render_data_from_fields(record), ensure_ascii=False)
+        paths = upload_paths((record.get("images") or []) + (record.get("mockups") or []))
+        prepared[(row["title"], row["created_at"])] = (
+            row, tech_stack_rows(None, record.get("tech_stack") or {}), sorted(paths)
+        )
+    return prepared
+
+
+def _prepare_tweaks(records: list[dict]) -> list[dict]:
+    """Строки пакета доработок; при повторе ключа побеждает последняя запись"""
+    return list({(r["title"], r["created_at"]): {name: r.get(name) for name in TWEAK_COLUMNS} for r in records}.values())
+
+
+def _prepared_batches(records: Iterable[dict]) -> Iterator[tuple[str, object]]:
+    """Разбор записей и подготовка пакетов по TRANSFER_BATCH_SIZE: (тип, подготовленный пакет)"""
+    prepare = {"project": _prepare_projects, "tweak": _prepare_tweaks}
+    batches = {"project": [], "tweak": []}
+    for record in records:
+        kind = record["type"]
+        batches[kind].append(record)
+        if len(batches[kind]) >= settings.transfer_batch_size:
+            yield kind, prepare[kind](batches[kind])
+            batches[kind] = []
+    for kind, batch in batches.items():
+        if batch:
+            yield kind, prepare[kind](batch)
+
+
+def _upsert(model, columns: list[str]):
+    """INSERT ... ON CONFLICT (title, created_at) DO UPDATE: новые записи вставляются, измененные обновляются.
+
+    Выполняется через executemany одним запросом на пакет. Совпадающие записи не
+    переписываются (и не возвращаются RETURNING) — повторный импорт того же файла почти
+    ничего не пишет. updated_at передается явно, поэтому onupdate не перезаписывает дату.
+    """
+    statement = upsert_insert(model.__table__)
+    changed = [name for name in columns if name not in ("title", "created_at")]
+    return statement.on_conflict_do_update(
+        index_elements=[model.title, model.created_at],
+        set_={name: statement.excluded[name] for name in changed},
+        where=or_(*[model.__table__.c[name].is_distinct_from(statement.excluded[name]) for name in changed]),
+    ).returning(model.id, model.title, model.created_at)
+
+
+async def _write_projects(db: AsyncSession, prepared: dict) -> int:
+    """Подготовленный пакет проектов: один upsert, затем технологии и ссылки на файлы записанных; возвращает число записанных"""
+    # Core поверх соединения сессии: пакету не нужны ни ORM bulk операции, ни identity map
+    connection = await db.connection()
+    result = await connection.execute(
+        _upsert(Project, PROJECT_COLUMNS + PROJECT_JSON_COLUMNS + ["render_data"]),
+        [row for row, _, _ in prepared.values()],
+    )
+    # Индексы обновляются только у вставленных и измененных — у остальных они уже актуальны
+    ids, tech_rows, upload_rows = [], [], []
+    for row in result:
+        _, tech, paths = prepared[(row.title, row.created_at)]
+        ids.append(row.id)
+        tech_rows.extend({**tech_row, "project_id": row.id} for tech_row in tech)
+        upload_rows.extend({"project_id": row.id, "path": path} for path in paths)
+    if ids:
+        await replace_projects_tech(db, ids, tech_rows)
+        await replace_projects_uploads(db, ids, upload_rows)
+    return len(ids)
+
+
+async def _write_tweaks(db: AsyncSession, rows: list[dict]) -> int:
+    """Подготовленный пакет доработок: один upsert; возвращает число записанных"""
+    connection = await db.connection()
+    result = await connection.execute(_upsert(Tweak, TWEAK_COLUMNS), rows)
+    return len(result.all())
+
+
+async def _counts(db: AsyncSession) -> dict:
+    """Количество проектов и доработок: upsert не сообщает, вставлена запись или обновлена"""
+    return {
+        "project": await db.scalar(select(func.count()).select_from(Project)),
+        "tweak": await db.scalar(select(func.count()).select_from(Tweak)),
+    }
+
+
+async def import_records(db: AsyncSession, records: Iterable[dict]) -> dict:
+    """Импорт записей пакетами по TRANSFER_BATCH_SIZE в текущей транзакции (commit — за вызывающим).
+
+    Натуральный ключ записи — (title, created_at): повторный импорт того же файла
+    обновляет только измененные записи, а не создает дубликаты. Чтение и разбор записей,
+    JSON-колонки и render_data готовятся в пуле потоков — следующий пакет, пока пишется
+    текущий, — в цикле событий выполняются только запросы к БД.
+    """
+    before = await _counts(db)
+    written = {"project": 0, "tweak": 0}
+    write = {"project": _write_projects, "tweak": _write_tweaks}
+
+    batches = _prepared_batches(records)
+    pending = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+    try:
+        while (batch := await pending) is not None:
+            pending = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+            kind, prepared = batch
+            written[kind] += await write[kind](db, prepared)
+    finally:
+        # При ошибке записи подготовка следующего пакета может еще идти в потоке
+        await asyncio.gather(pending, return_exceptions=True)
+
+    await refresh_tech_facets(db)
+    after = await _counts(db)
+    stats = {}
+    for kind, prefix in (("project", "projects"), ("tweak", "tweaks")):
+        created = after[kind] - before[kind]
+        stats[f"{prefix}_created"] = created
+        stats[f"{prefix}_updated"] = written[kind] - created
+    return stats
+
+
+def extract_uploads(archive: tarfile.TarFile) -> int:
+    """Распаковать загруженные файлы из архива в UPLOAD_DIR; существующие не перезаписываются"""
+    upload_root = os.path.realpath(settings.upload_dir)
+    written = 0
+    for member in archive:
+        if not member.isfile() or not member.name.startswith(ARCHIVE_UPLOADS):
+            continue
+        target = os.path.realpath(os.path.join(upload_root, member.name[len(ARCHIVE_UPLOADS):]))
+        if os.path.commonpath([upload_root, target]) != upload_root:
+            raise ValueError(f"Недопустимый путь в архиве: {member.name}")
+        if os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with archive.extractfile(member) as source, open(target, "wb") as f:
+            shutil.copyfileobj(source, f)
+        written += 1
+    return written
+
+
+def _open_archive(fileobj: BinaryIO) -> Optional[tuple[tarfile.TarFile, BinaryIO]]:
+    """(архив, NDJSON из него) для tar из export --files, None для NDJSON"""
+    if not tarfile.is_tarfile(fileobj):
+        fileobj.seek(0)
+        return None
+    fileobj.seek(0)
+    archive = tarfile.open(fileobj=fileobj, mode="r:*")
+    try:
+        return archive, archive.extractfile(ARCHIVE_NDJSON)
+    except KeyError:
+        archive.close()
+        raise ValueError(f"В архиве нет {ARCHIVE_NDJSON}")
+
+
+async def import_file(db: AsyncSession, fileobj: BinaryIO) -> dict:
+    """Импорт NDJSON или tar архива из export --files (определяется по содержимому); файл читается в пуле потоков"""
+    opened = await asyncio.to_thread(_open_archive, fileobj)
+    if opened is None:
+        return await import_records(db, parse_lines(fileobj))
+
+    archive, ndjson = opened
+    with archive:
+        stats = await import_records(db, parse_lines(ndjson))
+        stats["files"] = await asyncio.to_thread(extract_uploads, archive)
+    return stats
+
+
+# ==================== Командная строка ====================
+
+def run_export(output: str, include_files: bool = False):
+    """Экспорт в файл из командной строки"""
+    async def main():
+        try:
+            with open(output, "wb") as f:
+                async for chunk in export_stream(include_files):
+                    f.write(chunk)
+        finally:
+            await dispose_engines()
+
+    asyncio.run(main())
+
+
+def run_import(source: Optional[str] = None, records: Optional[Iterable[dict]] = None) -> dict:
+    """Импорт файла (или готовых записей) одной транзакцией из командной строки и скриптов"""
+    from app.cache import bump_data_version
+    from app.prerender import prerender_site
+
+    async def main() -> dict:
+        try:
+            async with AsyncSessionLocal() as db:
+                if source is not None:
+                    with open(source, "rb") as f:
+                        stats = await import_file(db, f)
+                else:
+                    stats = await import_records(db, (normalize_record(record) for record in records))
+                await db.commit()
+            # Работающие воркеры сбросят кэши страниц, статическая версия обновится сразу
+            bump_data_version()
+            if settings.prerender_dir:
+                await prerender_site(settings.prerender_dir)
+            return stats
+        finally:
+            await dispose_engines()
+
+    return asyncio.run(main())
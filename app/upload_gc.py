@@ -0,0 +1,316 @@
+"""Фоновая сверка загруженных файлов со ссылками проектов: карантин и удаление файлов без ссылок.
+
+Админка файлы не удаляет. Раз в UPLOAD_GC_INTERVAL секунд один из воркеров обходит
+UPLOAD_DIR пакетами и сравнивает файлы с путями из images и mockups проектов (индекс
+project_uploads). Файлы без ссылок переносятся в UPLOAD_QUARANTINE_DIR и удаляются
+через UPLOAD_GC_GRACE_HOURS; если на файл из карантина снова сослались, он
+возвращается на место. Ссылки на отсутствующие файлы попадают в отчет.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Iterator, List, Optional, Set
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import AsyncReadSessionLocal, ProjectUpload, dispose_engines
+from app.images import IMAGE_VARIANTS, derived_static_path
+
+
+# Временные файлы хранилища (app/blobs.py) старше суток остались от прерванных загрузок
+TMP_MAX_AGE = 24 * 3600
+# Сколько ссылок на отсутствующие файлы перечислять в отчете
+REPORT_DANGLING_LIMIT = 100
+# Где в UPLOAD_DIR лежат загрузки: хранилище, макеты и файлы в корне (прежняя схема),
+# адаптивные версии. Остальное в директории сверка не трогает
+UPLOAD_DIRS = {"blobs", "mockups", "derived"}
+
+
+def _report_path() -> str:
+    return os.path.join(settings.upload_quarantine_dir, "report.json")
+
+
+def read_report() -> Optional[dict]:
+    """Отчет последнего прохода (общий для всех воркеров)"""
+    try:
+        with open(_report_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_report(report: dict):
+    path = _report_path()
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def _scan_batches(root: str, skip_dirs: Set[str], batch_size: int,
+                  top_dirs: Optional[Set[str]] = None) -> Iterator[List[tuple]]:
+    """Обход директории пакетами по batch_size файлов (путь, mtime) без полного списка в памяти.
+
+    Скрытые файлы и директории (.gitkeep, .lock) пропускаются; top_dirs ограничивает
+    поддиректории корня, в которые заходит обход.
+    """
+    stack = [root]
+    batch = []
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if top_dirs is not None and directory == root and entry.name not in top_dirs:
+                    continue
+                if os.path.realpath(entry.path) not in skip_dirs:
+                    stack.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                try:
+                    batch.append((entry.path, entry.stat().st_mtime))
+                except FileNotFoundError:
+                    continue
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def _move(source: str, target: str):
+    """Перенести файл (между файловыми системами — копированием) и отметить время переноса"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+    os.utime(target)
+
+
+def _restore(path: str, upload_root: str, quarantine_root: str):
+    """Вернуть файл из карантина вместе с его адаптивными версиями"""
+    for static_path in [path] + [derived_static_path(path, width) for width in IMAGE_VARIANTS.values()]:
+        relative = static_path.removeprefix("uploads/")
+        quarantined = os.path.join(quarantine_root, relative)
+        if os.path.exists(quarantined):
+            _move(quarantined, os.path.join(upload_root, relative))
+
+
+async def _referenced_paths() -> Set[str]:
+    """Все пути uploads/..., на которые ссылаются проекты; читаются пакетами по пути"""
+    paths: Set[str] = set()
+    last = ""
+    async with AsyncReadSessionLocal() as db:
+        while True:
+            batch = list(await db.scalars(
+                select(ProjectUpload.path).where(ProjectUpload.path > last)
+                .group_by(ProjectUpload.path).order_by(ProjectUpload.path)
+                .limit(settings.upload_gc_batch_size)
+            ))
+            if not batch:
+                return paths
+            paths.update(batch)
+            last = batch[-1]
+
+
+async def _referencing_projects(paths: List[str]) -> dict:
+    """{путь: [id проектов]} для отчета о ссылках на отсутствующие файлы"""
+    if not paths:
+        return {}
+    async with AsyncReadSessionLocal() as db:
+        rows = await db.execute(
+            select(ProjectUpload.path, ProjectUpload.project_id).where(ProjectUpload.path.in_(paths))
+        )
+    projects: dict = {}
+    for row in rows:
+        projects.setdefault(row.path, []).append(row.project_id)
+    return projects
+
+
+async def _nap():
+    """Пауза между пакетами: проход не занимает диск и цикл событий подряд"""
+    await asyncio.sleep(0.01)
+
+
+async def reconcile_uploads(dry_run: bool = False) -> Optional[dict]:
+    """Один проход сверки; None, если его уже выполняет другой воркер.
+
+    dry_run — только отчет, файлы не переносятся и не удаляются.
+    """
+    upload_root = os.path.realpath(settings.upload_dir)
+    quarantine_root = os.path.realpath(settings.upload_quarantine_dir)
+    os.makedirs(quarantine_root, exist_ok=True)
+    with open(os.path.join(quarantine_root, ".lock"), "w") as lock:
+        try:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        try:
+            return await _reconcile(upload_root, quarantine_root, dry_run)
+        finally:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+async def _reconcile(upload_root: str, quarantine_root: str, dry_run: bool) -> dict:
+    started = time.perf_counter()
+    now = time.time()
+    report = {
+        "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "dry_run": dry_run,
+        "scanned": 0,
+        "orphans": 0,
+        "quarantined": 0,
+        "restored": 0,
+        "deleted": 0,
+        "tmp_deleted": 0,
+        "dangling_count": 0,
+        "dangling": [],
+    }
+
+    referenced = await _referenced_paths()
+    expected_derived = {derived_static_path(path, width) for path in referenced for width in IMAGE_VARIANTS.values()}
+    tmp_dir = os.path.join(upload_root, "blobs", "tmp")
+    seen: Set[str] = set()
+
+    def process_uploads(batch: List[tuple]):
+        for file_path, mtime in batch:
+            report["scanned"] += 1
+            if os.path.dirname(file_path) == tmp_dir:
+                if now - mtime > TMP_MAX_AGE and not dry_run:
+                    os.remove(file_path)
+                    report["tmp_deleted"] += 1
+                continue
+            relative = os.path.relpath(file_path, upload_root).replace(os.sep, "/")
+            path = f"uploads/{relative}"
+            seen.add(path)
+            if path in referenced or path in expected_derived:
+                continue
+            # Свежий файл мог быть только что загружен для проекта, который еще не сохранен
+            if now - mtime < settings.upload_gc_min_age:
+                continue
+            report["orphans"] += 1
+            if not dry_run:
+                _move(file_path, os.path.join(quarantine_root, relative))
+                report["quarantined"] += 1
+
+    batches = _scan_batches(upload_root, {quarantine_root}, settings.upload_gc_batch_size, UPLOAD_DIRS)
+    while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+        await asyncio.to_thread(process_uploads, batch)
+        await _nap()
+
+    # Ссылки на отсутствующие файлы: из карантина файл возвращается, остальные — в отчет
+    missing = sorted(referenced - seen)
+    dangling = []
+    for path in missing:
+        if os.path.exists(os.path.join(quarantine_root, path.removeprefix("uploads/"))):
+            if not dry_run:
+                await asyncio.to_thread(_restore, path, upload_root, quarantine_root)
+                report["restored"] += 1
+            continue
+        dangling.append(path)
+    report["dangling_count"] = len(dangling)
+    projects = await _referencing_projects(dangling[:REPORT_DANGLING_LIMIT])
+    report["dangling"] = [{"path": path, "projects": projects.get(path, [])} for path in dangling[:REPORT_DANGLING_LIMIT]]
+
+    grace = settings.upload_gc_grace_hours * 3600
+
+    def purge_quarantine(batch: List[tuple]):
+        for file_path, mtime in batch:
+            if os.path.dirname(file_path) == quarantine_root or now - mtime < grace:
+                continue
+            if not dry_run:
+                os.remove(file_path)
+                report["deleted"] += 1
+                # Опустевшие директории убираются вверх до корня карантина, но не выше
+                directory = os.path.dirname(file_path)
+                while directory != quarantine_root and directory.startswith(quarantine_root + os.sep):
+                    try:
+                        os.rmdir(directory)
+                    except OSError:
+                        break
+                    directory = os.path.dirname(directory)
+
+    batches = _scan_batches(quarantine_root, set(), settings.upload_gc_batch_size)
+    while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+        await asyncio.to_thread(purge_quarantine, batch)
+        await _nap()
+
+    report["duration_s"] = round(time.perf_counter() - started, 2)
+    if not dry_run:
+        await asyncio.to_thread(_write_report, report)
+    return report
+
+
+def _summary(report: dict) -> str:
+    return (
+        f"Сверка загрузок: файлов {report['scanned']}, без ссылок {report['orphans']}, "
+        f"в карантин {report['quarantined']}, возвращено {report['restored']}, удалено {report['deleted']}, "
+        f"ссылок на отсутствующие файлы {report['dangling_count']}"
+    )
+
+
+class UploadReconciler:
+    """Периодическая сверка загрузок в фоне каждого воркера.
+
+    Проход выполняет тот воркер, который первым захватит блокировку, и только если
+    предыдущий проход (любого воркера) был не меньше UPLOAD_GC_INTERVAL назад.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Запустить периодическую сверку, если задан UPLOAD_GC_INTERVAL"""
+        if settings.upload_gc_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def _due(self) -> bool:
+        report = read_report()
+        if not report:
+            return True
+        last = datetime.fromisoformat(report["started_at"])
+        return (datetime.utcnow() - last).total_seconds() >= settings.upload_gc_interval
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.upload_gc_interval)
+            if not self._due():
+                continue
+            try:
+                report = await reconcile_uploads()
+            except Exception as e:
+                print(f"Не удалось выполнить сверку загрузок: {e}")
+                continue
+            if report is not None:
+                print(_summary(report))
+
+    async def stop(self):
+        """Остановить сверку; прерванный проход повторится в следующий раз"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+upload_reconciler = UploadReconciler()
+
+
+def run_reconcile(dry_run: bool = False) -> Optional[dict]:
+    """Сверка из командной строки: отдельный event loop, соединения закрываются после"""
+    async def main() -> Optional[dict]:
+        try:
+            report = await reconcile_uploads(dry_run=dry_run)
+            if report is not None:
+                print(_summary(report))
+            return report
+        finally:
+            await dispose_engines()
+
+    return asyncio.run(main())
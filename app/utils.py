@@ -1,15 +1,21 @@
 """Утилиты для работы с проектами"""
 from typing import List, Dict, Optional
 from datetime import datetime
-from fastapi import UploadFile
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import UploadFile, HTTPException
+from sqlalchemy import select
 import os
-import shutil
 import zipfile
-import io
-import uuid
+import zlib
+import json
+import base64
 
-from app.database import Project
+from app.database import Project, SessionLocal
+from app.blobs import store_blob
 from app.config import settings
+from app.images import image_view
+from app.metrics import observe_upload
+from app.tech_categories import resolve_tech_category, tech_category_icon
 
 
 def project_to_dict(project: Project) -> dict:
@@ -19,6 +25,9 @@ def project_to_dict(project: Project) -> dict:
     except Exception:
         # Если не удалось распарсить tech_stack, возвращаем пустой словарь
         tech_stack = {}
+    images = project.get_images_list()
+    mockups = project.get_mockups_list()
+    image_meta = project.get_image_meta_dict()
     
     return {
         "id": project.id,
@@ -29,14 +38,162 @@ def project_to_dict(project: Project) -> dict:
         "budget": project.budget,
         "benefits": project.benefits,
         "tech_stack": tech_stack,
-        "images": project.get_images_list(),
-        "mockups": project.get_mockups_list(),
+        "images": images,
+        "mockups": mockups,
+        "image_views": [image_view(path, image_meta) for path in images],
+        "mockup_views": [image_view(path, image_meta) for path in mockups],
         "github_url": project.github_url,
         "created_at": project.created_at,
         "updated_at": project.updated_at,
     }
 
 
+# Версия формата Project.render_data: записи другой версии пересобираются при старте
+PROJECT_RENDER_VERSION = 3
+
+
+def split_tech_tags(value) -> List[str]:
+    """Разбить значение технологии на теги (строка через запятую или список)"""
+    if not value:
+        return []
+    items = value if isinstance(value, list) else str(value).split(",")
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def tech_item(category: str, value) -> dict:
+    """Категория стека с канонической категорией из реестра, иконкой и тегами"""
+    key = resolve_tech_category(category)
+    return {"category": category, "category_key": key, "icon": tech_category_icon(key), "tags": split_tech_tags(value)}
+
+
+def project_render_data(project: Project) -> dict:
+    """Готовые для лендинга данные проекта.
+
+    Собираются один раз при сохранении проекта и хранятся в Project.render_data:
+    JSON-поля уже разобраны, теги технологий разбиты, категории сопоставлены с реестром.
+    id в данные не входит — импорт собирает их до записи, когда id новых проектов еще нет.
+    """
+    return render_data_from_fields({
+        "title": project.title,
+        "industry": project.industry,
+        "results": project.get_results_list(),
+        "timeline": project.timeline,
+        "budget": project.budget,
+        "benefits": project.benefits,
+        "tech_stack": project.get_tech_stack_dict(),
+        "images": project.get_images_list(),
+        "mockups": project.get_mockups_list(),
+        "image_meta": project.get_image_meta_dict(),
+        "github_url": project.github_url,
+    })
+
+
+def render_data_from_fields(fields: dict) -> dict:
+    """render_data из разобранных полей проекта (как в записи NDJSON) — без модели и повторного разбора JSON"""
+    image_meta = fields.get("image_meta") or {}
+    return {
+        "version": PROJECT_RENDER_VERSION,
+        "title": fields["title"],
+        "industry": fields["industry"],
+        "results": fields.get("results") or [],
+        "timeline": fields["timeline"],
+        "budget": fields["budget"],
+        "benefits": fields["benefits"],
+        "tech_items": [tech_item(key, value) for key, value in (fields.get("tech_stack") or {}).items()],
+        "image_views": [image_view(path, image_meta) for path in fields.get("images") or []],
+        "mockup_views": [image_view(path, image_meta) for path in fields.get("mockups") or []],
+        "github_url": fields.get("github_url"),
+    }
+
+
+def refresh_project_render_data(project: Project):
+    """Пересобрать render_data проекта — вызывается при каждой записи проекта"""
+    project.set_render_data_dict(project_render_data(project))
+
+
+def decode_render_data(render_data: Optional[str]) -> Optional[dict]:
+    """Разобрать Project.render_data; None, если данных нет или формат устарел"""
+    if not render_data:
+        return None
+    try:
+        data = json.loads(render_data)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if data.get("version") != PROJECT_RENDER_VERSION:
+        return None
+    return data
+
+
+def backfill_project_render_data() -> int:
+    """Собрать render_data для проектов без него или с устаревшим форматом, вернуть число обновленных"""
+    db = SessionLocal()
+    try:
+        updated = 0
+        for project in db.scalars(select(Project)):
+            if decode_render_data(project.render_data) is None:
+                refresh_project_render_data(project)
+                updated += 1
+        db.commit()
+        return updated
+    finally:
+        db.close()
+
+
+# Поля проекта, доступные в /api/projects (порядок определяет порядок ключей в ответе)
+PROJECT_API_FIELDS = [
+    "id", "title", "industry", "results", "timeline", "budget", "benefits",
+    "tech_stack", "images", "mockups", "github_url", "created_at", "updated_at",
+]
+
+# JSON-колонки проекта и значение по умолчанию для пустых
+PROJECT_JSON_FIELDS = {
+    "results": list,
+    "tech_stack": dict,
+    "images": list,
+    "mockups": list,
+}
+
+
+def parse_api_fields(fields: Optional[str]) -> List[str]:
+    """Парсинг параметра fields= (через запятую), ValueError для неизвестных полей"""
+    if not fields:
+        return list(PROJECT_API_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in PROJECT_API_FIELDS]
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(unknown)}")
+    return list(dict.fromkeys(requested)) or list(PROJECT_API_FIELDS)
+
+
+def decode_api_value(field: str, value):
+    """Декодировать JSON-колонку проекта для ответа API"""
+    if field not in PROJECT_JSON_FIELDS:
+        return value
+    if value:
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            pass
+    return PROJECT_JSON_FIELDS[field]()
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """Закодировать курсор пагинации по ключу (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Декодировать курсор пагинации, ValueError для некорректного значения"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, item_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except Exception:
+        raise ValueError("Некорректный курсор")
+
+
 def parse_form_results(results: str) -> List[str]:
     """Парсинг результатов из формы (разделены новой строкой)"""
     return [r.strip() for r in results.split("\n") if r.strip()]
@@ -56,45 +213,72 @@ def parse_form_tech_stack(
 
 
 def save_uploaded_images(images: List[UploadFile]) -> List[str]:
-    """Сохранить загруженные изображения и вернуть список путей"""
+    """Сохранить загруженные изображения в хранилище и вернуть список путей"""
     image_paths = []
+    size = 0
     for image in images:
         if image.filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{timestamp}_{image.filename}"
-            file_path = os.path.join(settings.upload_dir, filename)
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            image_paths.append(f"uploads/{filename}")
+            path, file_size = store_blob(image.file, image.filename)
+            size += file_size
+            image_paths.append(path)
+    observe_upload("image", len(image_paths), size)
     return image_paths
 
 
+def _check_mockups_archive(members: List[zipfile.ZipInfo], total_members: int):
+    """Проверка лимитов архива макетов по заголовкам до распаковки (защита от zip-бомб)"""
+    if total_members > settings.mockups_max_members:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Слишком много файлов в архиве макетов (максимум {settings.mockups_max_members})",
+        )
+    total_size = 0
+    for info in members:
+        # ZipExtFile не отдает больше file_size байт, поэтому заголовкам можно доверять
+        total_size += info.file_size
+        if info.file_size > info.compress_size * settings.mockups_max_ratio:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Подозрительная степень сжатия файла {os.path.basename(info.filename)} в архиве макетов",
+            )
+    if total_size > settings.mockups_max_total_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Размер распакованных макетов превышает {settings.mockups_max_total_size // (1024 * 1024)} МБ",
+        )
+
+
 def save_mockups_zip(zip_file: Optional[UploadFile]) -> List[str]:
-    """Распаковать zip архив, сохранить PNG изображения в uploads/mockups, вернуть пути"""
+    """Распаковать zip архив, сохранить PNG изображения в хранилище, вернуть пути в порядке имен в архиве.
+
+    Архив читается прямо из временного файла загрузки, без копии в памяти;
+    файлы распаковываются параллельно в пуле потоков.
+    """
     if not zip_file or not zip_file.filename:
         return []
 
-    mockups_dir = os.path.join(settings.upload_dir, "mockups")
-    os.makedirs(mockups_dir, exist_ok=True)
-
-    mockup_paths: List[str] = []
-    # UploadFile может быть уже в конце — сбрасываем позицию
-    try:
-        zip_file.file.seek(0)
-    except Exception:
-        pass
-    content = zip_file.file.read()
-    if not content:
+    # UploadFile может быть уже в конце — определяем размер и сбрасываем позицию
+    source = zip_file.file
+    source.seek(0, os.SEEK_END)
+    archive_size = source.tell()
+    if archive_size == 0:
         return []
+    source.seek(0)
+    observe_upload("mockups_zip", 1, archive_size)
 
-    batch_id = datetime.now().strftime("%Y%m%d_%H%M%S") + "_" + uuid.uuid4().hex[:6]
+    try:
+        zf = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Файл макетов не является zip архивом")
 
-    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+    with zf:
+        infos = zf.infolist()
         # Сортировка для стабильного порядка отображения
-        names = sorted(n for n in zf.namelist() if not n.endswith("/"))
-        idx = 0
-        for name in names:
-            base = os.path.basename(name)
+        members = []
+        for info in sorted(infos, key=lambda i: i.filename):
+            if info.is_dir():
+                continue
+            base = os.path.basename(info.filename)
             if not base:
                 continue
             if base.startswith("._"):
@@ -102,15 +286,28 @@ def save_mockups_zip(zip_file: Optional[UploadFile]) -> List[str]:
                 continue
             if not base.lower().endswith(".png"):
                 continue
-            safe_name = base.replace("\\", "_").replace("/", "_")
-            filename = f"{batch_id}_{idx:04d}_{safe_name}"
-            idx += 1
-            file_path = os.path.join(mockups_dir, filename)
-            with zf.open(name) as src, open(file_path, "wb") as dst:
-                shutil.copyfileobj(src, dst)
-            mockup_paths.append(f"uploads/mockups/{filename}")
+            members.append(info)
+        _check_mockups_archive(members, len(infos))
+        if not members:
+            return []
+
+        def extract(info: zipfile.ZipInfo) -> str:
+            with zf.open(info) as src:
+                return store_blob(src, info.filename)[0]
+
+        with ThreadPoolExecutor(max_workers=settings.mockups_extract_workers) as pool:
+            futures = [pool.submit(extract, info) for info in members]
+            errors = [f.exception() for f in futures if f.exception() is not None]
 
-    return mockup_paths
+        # Уже сохраненные файлы при ошибке не удаляются: на то же содержимое могут ссылаться
+        # другие проекты, а файлы без ссылок уберет сверка загрузок
+        if errors:
+            if isinstance(errors[0], (zipfile.BadZipFile, zlib.error)):
+                raise HTTPException(status_code=400, detail="Архив макетов поврежден")
+            raise errors[0]
+
+    observe_upload("mockup", len(members), sum(info.file_size for info in members))
+    return [f.result() for f in futures]
 
 
 def parse_existing_mockups(existing_mockups: Optional[str]) -> List[str]:
@@ -144,39 +341,3 @@ TWEAK_CATEGORIES = {
     "refactoring": "Рефакторинг",
     "other": "Другое",
 }
-
-
-def get_tech_icon(tech_category: str) -> Optional[str]:
-    """Получить путь к SVG иконке для категории технологии"""
-    # Нормализация названия категории (приведение к нижнему регистру)
-    category_lower = tech_category.lower().strip()
-    
-    # Маппинг категорий к файлам иконок
-    icon_mapping = {
-        'frontend': 'frontend.svg',
-        'backend': 'backend.svg',
-        'database': 'database.svg',
-        'база данных': 'database.svg',
-        'mobile': 'mobile.svg',
-        'мобильный': 'mobile.svg',
-        'devops': 'devops.svg',
-        'design': 'design.svg',
-        'дизайн': 'design.svg',
-        'testing': 'testing.svg',
-        'тестирование': 'testing.svg',
-        'cloud': 'cloud.svg',
-        'облако': 'cloud.svg',
-        'api': 'api.svg',
-    }
-    
-    # Проверка точного совпадения
-    if category_lower in icon_mapping:
-        return f"icons/{icon_mapping[category_lower]}"
-    
-    # Проверка частичного совпадения (например, "Frontend: Next.js" -> "frontend")
-    for key in icon_mapping.keys():
-        if key in category_lower:
-            return f"icons/{icon_mapping[key]}"
-    
-    # Если иконка не найдена, возвращаем None
-    return None
@@ -0,0 +1 @@
+"""Бенчмарки: синтетические портфолио, сценарии нагрузки и сравнение результатов между коммитами"""
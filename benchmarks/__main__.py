@@ -0,0 +1,57 @@
+"""Командная строка бенчмарков: python -m benchmarks run | compare | seed"""
+import argparse
+
+from benchmarks.fixtures import SIZES
+from benchmarks.scenarios import SCENARIOS
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Бенчмарки Alteran Portfolio")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="прогнать сценарии и сохранить результаты в JSON")
+    run_parser.add_argument("--size", choices=list(SIZES), default="1k", help="размер синтетического портфолио")
+    run_parser.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi", help="ASGI клиент в процессе или настоящий uvicorn")
+    run_parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS), help="сценарии (по умолчанию все)")
+    run_parser.add_argument("--requests", type=int, default=300, help="запросов на сценарий чтения")
+    run_parser.add_argument("--write-requests", type=int, default=30, help="запросов на сценарий записи")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="параллельных запросов")
+    run_parser.add_argument("--warmup", type=int, default=10, help="запросов прогрева перед замером")
+    run_parser.add_argument("--workers", type=int, default=1, help="воркеров uvicorn в режиме uvicorn")
+    run_parser.add_argument("--output", help="файл результатов (по умолчанию benchmarks/results/<время>-<коммит>-<набор>-<режим>.json)")
+    run_parser.add_argument("--keep", action="store_true", help="не удалять рабочую копию базы после прогона")
+
+    compare_parser = subparsers.add_parser("compare", help="сравнить два файла результатов")
+    compare_parser.add_argument("base", help="результаты до изменения")
+    compare_parser.add_argument("new", help="результаты после изменения")
+
+    seed_parser = subparsers.add_parser("seed", help="засеять базу текущего окружения (DATABASE_URL, UPLOAD_DIR)")
+    seed_parser.add_argument("size", choices=list(SIZES))
+
+    args = parser.parse_args()
+    # Модули приложения импортируются внутри команд: окружение прогона задается до чтения настроек
+    if args.command == "run":
+        from benchmarks.runner import run
+
+        options = {
+            "requests": args.requests,
+            "write_requests": args.write_requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "workers": args.workers,
+        }
+        output = run(args.size, args.mode, args.scenarios, options, output=args.output, keep=args.keep)
+        print(f"Результаты: {output}")
+    elif args.command == "compare":
+        from benchmarks.runner import compare
+
+        print("\n".join(compare(args.base, args.new)))
+    elif args.command == "seed":
+        from benchmarks.runner import seed_database
+
+        stats = seed_database(args.size)
+        print("Засеяно: " + ", ".join(f"{name} {count}" for name, count in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
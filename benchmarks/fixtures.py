@@ -0,0 +1,108 @@
+"""Синтетические данные для бенчмарков: портфолио заданного размера и файлы для загрузки"""
+import io
+import random
+import zipfile
+from datetime import datetime, timedelta
+from typing import Dict, Iterator
+
+from PIL import Image, ImageDraw
+
+# Версия генератора: при изменении данных засеянные базы в кэше пересоздаются
+FIXTURE_VERSION = 2
+
+# Размер набора -> количество проектов (доработок столько же)
+SIZES = {"10": 10, "1k": 1_000, "100k": 100_000}
+
+# Изображения, на которые ссылаются засеянные проекты (лежат в UPLOAD_DIR/bench)
+SEED_IMAGES = [f"uploads/bench/cover-{i}.jpg" for i in range(4)]
+
+TECHS = {
+    "Frontend": ["React", "Vue", "Svelte", "Angular", "Next.js", "TypeScript"],
+    "Backend": ["FastAPI", "Django", "Go", "Node.js", "Laravel"],
+    "База данных": ["PostgreSQL", "Redis", "MongoDB", "ClickHouse", "SQLite"],
+    "Mobile": ["Flutter", "Swift", "Kotlin", "React Native"],
+    "DevOps": ["Docker", "Kubernetes", "GitHub Actions", "Terraform"],
+    "Аналитика": ["Metabase", "Superset"],
+}
+WORDS = (
+    "доставка платформа аналитика склад магазин бронирование обучение финансы медицина "
+    "логистика маркетплейс подписка интеграция отчетность клиенты заказы каталог чат"
+).split()
+INDUSTRIES = ["E-commerce", "Финтех", "Образование", "Медицина", "Логистика", "HR", "Недвижимость"]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=words)).capitalize()
+
+
+def portfolio_records(size: str, seed: int = 1) -> Iterator[dict]:
+    """Записи NDJSON (формат app/transfer.py) для набора заданного размера — одинаковые при каждом запуске"""
+    # Настройки приложения читаются при импорте — app импортируется после записи окружения бенчмарка
+    from app.utils import TWEAK_CATEGORIES
+
+    categories = list(TWEAK_CATEGORIES)
+    count = SIZES[size]
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        created_at = start + timedelta(minutes=i)
+        yield {
+            "type": "project",
+            "title": f"Проект {i}: {_text(rng, 2)}",
+            "industry": rng.choice(INDUSTRIES),
+            "results": [_text(rng, 6) for _ in range(rng.randint(2, 5))],
+            "timeline": f"{rng.randint(1, 12)} мес.",
+            "budget": f"{rng.randint(5, 200) * 1000:,}$".replace(",", " "),
+            "benefits": _text(rng, rng.randint(20, 60)),
+            "tech_stack": {
+                category: ", ".join(rng.sample(values, min(len(values), rng.randint(1, 3))))
+                for category, values in rng.sample(list(TECHS.items()), rng.randint(2, 4))
+            },
+            "images": rng.sample(SEED_IMAGES, rng.randint(1, 3)),
+            "github_url": f"https://github.com/example/project-{i}" if i % 3 == 0 else None,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+    for i in range(count):
+        yield {
+            "type": "tweak",
+            "title": f"Доработка {i}: {_text(rng, 3)}",
+            "description": _text(rng, rng.randint(15, 40)),
+            "category": rng.choice(categories),
+            "project_name": f"Проект {rng.randrange(count)}",
+            "time_spent": f"{rng.randint(1, 40)} ч",
+            "github_url": None,
+            "created_at": start + timedelta(minutes=i, seconds=30),
+        }
+
+
+def image_bytes(index: int, size=(1600, 1000), format: str = "JPEG") -> bytes:
+    """Изображение с градиентом и фигурами: сжимается как фотография, а не как заливка"""
+    rng = random.Random(index)
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        r = rng.randint(20, 200)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, quality=85)
+    return buffer.getvalue()
+
+
+def mockups_zip_bytes(count: int = 3) -> bytes:
+    """Zip архив макетов с PNG экранами, как его загружают в админке"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i in range(count):
+            archive.writestr(f"mockups/screen-{i}.png", image_bytes(100 + i, size=(750, 1334), format="PNG"))
+    return buffer.getvalue()
+
+
+def upload_fixtures() -> Dict[str, bytes]:
+    """Файлы для сценариев создания и обновления проекта: имя -> содержимое"""
+    return {
+        "cover.jpg": image_bytes(10),
+        "detail.jpg": image_bytes(11),
+        "mockups.zip": mockups_zip_bytes(),
+    }
@@ -0,0 +1,317 @@
+"""Прогон бенчмарков: засеянная база, нагрузка через ASGI клиент или uvicorn, статистика и JSON результаты.
+
+Модули приложения импортируются только после того, как окружение прогона
+(DATABASE_URL, UPLOAD_DIR и т.д.) записано в os.environ: настройки читаются при импорте.
+"""
+import asyncio
+import json
+import math
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fixtures import FIXTURE_VERSION, SEED_IMAGES, image_bytes, portfolio_records, upload_fixtures
+from benchmarks.scenarios import SCENARIOS, BenchContext
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Засеянные базы переиспользуются между прогонами: набор 100k засеивается около минуты
+CACHE_DIR = os.path.join(ROOT, ".cache", "bench")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+ADMIN_PASSWORD = "bench"
+
+
+def bench_env(workspace: str) -> Dict[str, str]:
+    """Переменные окружения приложения, изолирующие прогон в директории workspace"""
+    database = os.path.join(workspace, "portfolio.db")
+    return {
+        "DATABASE_URL": f"sqlite:///{database}",
+        "ASYNC_DATABASE_URL": f"sqlite+aiosqlite:///{database}",
+        "UPLOAD_DIR": os.path.join(workspace, "uploads"),
+        "PAGE_CACHE_VERSION_FILE": os.path.join(workspace, "data_version"),
+        "ADMIN_PASSWORD": ADMIN_PASSWORD,
+        "PRERENDER_DIR": "",
+        "OPENAI_KEY": "",
+    }
+
+
+# ==================== Засеивание ====================
+
+def seed_database(size: str) -> dict:
+    """Засеять базу текущего окружения: изображения с WebP версиями, проекты и доработки через импорт"""
+    from app.database import init_db
+    from app.images import build_image_derivatives, shutdown_image_pool, upload_file_path
+    from app.transfer import run_import
+
+    for index, path in enumerate(SEED_IMAGES):
+        file_path = upload_file_path(path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(image_bytes(index))
+    image_meta = asyncio.run(build_image_derivatives(SEED_IMAGES))
+    shutdown_image_pool()
+
+    def records():
+        for record in portfolio_records(size):
+            if record["type"] == "project":
+                record["image_meta"] = {path: image_meta[path] for path in record["images"] if path in image_meta}
+            yield record
+
+    init_db()
+    return run_import(records=records())
+
+
+def ensure_seed(size: str) -> str:
+    """Директория засеянного набора в кэше; засеивается в отдельном процессе при первом запросе"""
+    target = os.path.join(CACHE_DIR, f"{size}-v{FIXTURE_VERSION}")
+    if os.path.exists(os.path.join(target, "portfolio.db")):
+        return target
+    tmp = f"{target}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    print(f"Засеивание набора {size} в {target}")
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks", "seed", size],
+        cwd=ROOT,
+        env={**os.environ, **bench_env(tmp)},
+        check=True,
+    )
+    print(f"Набор {size} засеян за {time.perf_counter() - started:.1f} с")
+    os.replace(tmp, target)
+    return target
+
+
+def prepare_workspace(size: str) -> str:
+    """Копия засеянного набора для одного прогона: сценарии записи не портят кэш"""
+    workspace = tempfile.mkdtemp(prefix=f"bench-{size}-")
+    shutil.copytree(ensure_seed(size), workspace, dirs_exist_ok=True)
+    return workspace
+
+
+# ==================== Статистика ====================
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Перцентиль методом ближайшего ранга по отсортированному списку"""
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def summarize(latencies: List[float], statuses: Counter, expected: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3)
+    return {
+        "requests": len(ordered),
+        "errors": len(ordered) - statuses[str(expected)],
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": ms(sum(ordered) / len(ordered)),
+            "p50": ms(percentile(ordered, 50)),
+            "p95": ms(percentile(ordered, 95)),
+            "p99": ms(percentile(ordered, 99)),
+            "max": ms(ordered[-1]),
+        },
+        "status": dict(statuses),
+    }
+
+
+async def run_scenario(ctx: BenchContext, name: str, requests: int, concurrency: int, warmup: int) -> dict:
+    """Прогреть сценарий, затем выполнить requests запросов в concurrency параллельных потоках"""
+    scenario = SCENARIOS[name]
+    for i in range(warmup):
+        await scenario["request"](ctx, i)
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    next_index = iter(range(warmup, warmup + requests))
+
+    async def worker():
+        for i in next_index:
+            started = time.perf_counter()
+            try:
+                response = await scenario["request"](ctx, i)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, scenario["status"], time.perf_counter() - started)
+
+
+async def run_scenarios(ctx: BenchContext, names: List[str], options: dict, save: Callable[[dict], None]):
+    """Вход в админку и сценарии по очереди; сценарии записи — после чтения, они сбрасывают кэши"""
+    response = await ctx.client.post("/admin/login", data={"password": ADMIN_PASSWORD})
+    if response.status_code != 302:
+        raise RuntimeError(f"Не удалось войти в админку: HTTP {response.status_code}")
+
+    results = {}
+    for name in sorted(names, key=lambda name: SCENARIOS[name]["write"]):
+        write = SCENARIOS[name]["write"]
+        results[name] = await run_scenario(
+            ctx,
+            name,
+            requests=options["write_requests"] if write else options["requests"],
+            concurrency=options["concurrency"],
+            warmup=min(options["warmup"], 2) if write else options["warmup"],
+        )
+        print(format_row(name, results[name]))
+        save(results)
+
+
+# ==================== Драйверы ====================
+
+async def run_asgi(size: str, names: List[str], options: dict, save: Callable[[dict], None]):
+    """Приложение в том же процессе через httpx.ASGITransport: без сети, только код приложения"""
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            await run_scenarios(BenchContext(client, size, upload_fixtures()), names, options, save)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Сервер завершился с кодом {process.returncode}")
+        try:
+            if (await client.get("/api/projects", params={"limit": 1})).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Сервер не запустился")
+
+
+async def run_uvicorn(size: str, names: List[str], options: dict, save: Callable[[dict], None]):
+    """Настоящий сервер: python main.py serve с WORKERS воркерами, нагрузка по HTTP с localhost"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "serve", "--host", "127.0.0.1", "--port", str(port), "--workers", str(options["workers"])],
+        cwd=ROOT,
+        env=os.environ.copy(),
+    )
+    try:
+        limits = httpx.Limits(max_connections=options["concurrency"], max_keepalive_connections=options["concurrency"])
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+            await _wait_ready(client, process)
+            await run_scenarios(BenchContext(client, size, upload_fixtures()), names, options, save)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+# ==================== Результаты ====================
+
+def git_revision() -> dict:
+    """Коммит и признак незакоммиченных изменений — чтобы сравнивать результаты между коммитами"""
+    def git(*args) -> str:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD") or None,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def format_row(name: str, result: dict) -> str:
+    latency = result["latency_ms"]
+    return (
+        f"{name:<24} {result['throughput_rps']:>9.1f} rps  p50 {latency['p50']:>8.1f}  "
+        f"p95 {latency['p95']:>8.1f}  p99 {latency['p99']:>8.1f} мс  ошибок {result['errors']}"
+    )
+
+
+def run(size: str, mode: str, names: List[str], options: dict, output: Optional[str] = None, keep: bool = False) -> str:
+    """Прогнать сценарии на копии набора size и сохранить результаты в JSON, вернуть путь к файлу.
+
+    Файл перезаписывается после каждого сценария: если прогон упадет (например,
+    процесс завершится по нехватке памяти на наборе 100k), замеры уже пройденных останутся.
+    """
+    revision = git_revision()
+    report = {
+        "meta": {
+            **revision,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "size": size,
+            "mode": mode,
+            "fixture_version": FIXTURE_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            **options,
+        },
+        "scenarios": {},
+    }
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{revision['commit'] or 'nogit'}-{size}-{mode}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+
+    def save(scenarios: Dict[str, dict]):
+        report["scenarios"] = scenarios
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    workspace = prepare_workspace(size)
+    os.environ.update(bench_env(workspace))
+    print(f"Набор {size}, режим {mode}, параллельность {options['concurrency']}, данные в {workspace}")
+    try:
+        driver = run_asgi if mode == "asgi" else run_uvicorn
+        asyncio.run(driver(size, names, options, save))
+    finally:
+        if not keep:
+            shutil.rmtree(workspace, ignore_errors=True)
+    return output
+
+
+def compare(base_path: str, new_path: str) -> List[str]:
+    """Таблица изменений пропускной способности и задержек между двумя файлами результатов"""
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    def change(old, value) -> str:
+        if not old:
+            return "     —"
+        return f"{(value - old) / old * 100:+6.1f}%"
+
+    lines = [
+        f"{base['meta'].get('commit')} -> {new['meta'].get('commit')} "
+        f"(набор {new['meta']['size']}, режим {new['meta']['mode']})",
+        f"{'сценарий':<24} {'rps':>18} {'p50 мс':>18} {'p95 мс':>18} {'p99 мс':>18}",
+    ]
+    if (base["meta"]["size"], base["meta"]["mode"]) != (new["meta"]["size"], new["meta"]["mode"]):
+        lines.insert(1, f"Внимание: базовый прогон — набор {base['meta']['size']}, режим {base['meta']['mode']}")
+    for name, result in new["scenarios"].items():
+        old = base["scenarios"].get(name)
+        if old is None:
+            lines.append(f"{name:<24} нет в {base_path}")
+            continue
+        cells = [f"{result['throughput_rps']:>9.1f} {change(old['throughput_rps'], result['throughput_rps'])}"]
+        for key in ("p50", "p95", "p99"):
+            value = result["latency_ms"][key]
+            cells.append(f"{value:>9.1f} {change(old['latency_ms'][key], value)}")
+        lines.append(f"{name:<24} " + " ".join(cells))
+    return lines
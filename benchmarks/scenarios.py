@@ -0,0 +1,91 @@
+"""Сценарии нагрузки: один запрос сценария — одна функция над httpx клиентом"""
+import httpx
+
+from benchmarks.fixtures import SIZES
+
+
+PROJECT_FORM = {
+    "industry": "E-commerce",
+    "results": "Рост конверсии на 25%\nСнижение нагрузки на поддержку",
+    "timeline": "3 мес.",
+    "budget": "40 000$",
+    "benefits": "Бенчмарк создания и обновления проекта с изображениями и макетами",
+    "tech_stack_keys": ["Frontend", "Backend", "База данных"],
+    "tech_stack_values": ["React, TypeScript", "FastAPI", "PostgreSQL, Redis"],
+}
+
+
+class BenchContext:
+    """Общее состояние прогона: клиент, размер набора и файлы для загрузки"""
+
+    def __init__(self, client: httpx.AsyncClient, size: str, uploads: dict[str, bytes]):
+        self.client = client
+        self.size = size
+        self.uploads = uploads
+
+    def project_files(self) -> list:
+        """Multipart файлы формы проекта: два изображения и zip макетов"""
+        return [
+            ("images", ("cover.jpg", self.uploads["cover.jpg"], "image/jpeg")),
+            ("images", ("detail.jpg", self.uploads["detail.jpg"], "image/jpeg")),
+            ("mockups_zip", ("mockups.zip", self.uploads["mockups.zip"], "application/zip")),
+        ]
+
+
+async def index(ctx: BenchContext, i: int) -> httpx.Response:
+    return await ctx.client.get("/")
+
+
+async def index_render(ctx: BenchContext, i: int) -> httpx.Response:
+    # Кэш страниц сбрасывается перед каждым запросом во всех воркерах — измеряется рендер
+    from app.cache import bump_data_version
+
+    bump_data_version()
+    return await ctx.client.get("/")
+
+
+async def api_projects(ctx: BenchContext, i: int) -> httpx.Response:
+    return await ctx.client.get("/api/projects")
+
+
+async def api_projects_filtered(ctx: BenchContext, i: int) -> httpx.Response:
+    return await ctx.client.get("/api/projects", params={"tech": "react", "category": "backend", "limit": 50})
+
+
+async def admin_dashboard(ctx: BenchContext, i: int) -> httpx.Response:
+    return await ctx.client.get("/admin/dashboard")
+
+
+async def admin_create(ctx: BenchContext, i: int) -> httpx.Response:
+    return await ctx.client.post(
+        "/admin/projects",
+        data={"title": f"Бенчмарк {i}", **PROJECT_FORM},
+        files=ctx.project_files(),
+    )
+
+
+async def admin_update(ctx: BenchContext, i: int) -> httpx.Response:
+    # Обновляются засеянные проекты по кругу; прежние изображения и макеты заменяются новыми
+    project_id = i % SIZES[ctx.size] + 1
+    return await ctx.client.post(
+        f"/admin/projects/{project_id}",
+        data={
+            "title": f"Проект {project_id} (обновлен)",
+            **PROJECT_FORM,
+            "existing_images": "",
+            "existing_mockups": "",
+        },
+        files=ctx.project_files(),
+    )
+
+
+# Имя -> функция запроса, ожидаемый статус и признак записи (сценарии записи меняют БД прогона)
+SCENARIOS = {
+    "index": {"request": index, "status": 200, "write": False},
+    "index_render": {"request": index_render, "status": 200, "write": False},
+    "api_projects": {"request": api_projects, "status": 200, "write": False},
+    "api_projects_filtered": {"request": api_projects_filtered, "status": 200, "write": False},
+    "admin_dashboard": {"request": admin_dashboard, "status": 200, "write": False},
+    "admin_create": {"request": admin_create, "status": 302, "write": True},
+    "admin_update": {"request": admin_update, "status": 302, "write": True},
+}
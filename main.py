@@ -1,5 +1,5 @@
-def main():
-    print("Hello from main-site-templats!")
+"""Точка входа: python main.py serve | migrate"""
+from app.cli import main
 
 
 if __name__ == "__main__":